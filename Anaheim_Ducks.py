@@ -1,7 +1,11 @@
-from datetime import datetime
+from datetime import datetime, date
 import pytz
-import aiohttp  # For asynchronous HTTP requests
 import logging
+
+import http_cache
+import singleflight
+import tracing
+from schedules import HomeGame, SeasonSchedule, parse_utc
 # today = datetime.today().strftime('%Y-%m-%d')
 # NHL_API_URL: [str] = f"https://api-web.nhle.com/v1/score/{today}"
 
@@ -12,12 +16,15 @@ pacific_tz = pytz.timezone("America/Los_Angeles")
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
-async def get_game_id():
+# returns today's NHL scoreboard, shared by every function that reads it within a few seconds
+async def get_scoreboard():
     today = datetime.now(pacific_tz).strftime('%Y-%m-%d')
     NHL_API_URL: [str] = f"https://api-web.nhle.com/v1/score/{today}"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(NHL_API_URL) as response:
-            data_nhl = await response.json()
+    return await singleflight.get_json(NHL_API_URL)
+
+
+async def get_game_id():
+    data_nhl = await get_scoreboard()
 
     # Check if it was a Ducks home game and they scored 5 points
     daily_games = data_nhl['games']
@@ -27,49 +34,48 @@ async def get_game_id():
     return None
 
 
-# Receives the next home game
-async def get_ducks_next_home_game():
+# downloads the Ducks' season and returns their home games
+async def load_season_schedule():
     # Define the endpoint for the Ducks' schedule
     schedule_url = f"https://api-web.nhle.com/v1/club-schedule-season/ANA/now"
-    today_home = datetime.now(pacific_tz).strftime('%Y-%m-%d')
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(schedule_url) as response:
-            schedule_data = await response.json()
+    return parse_season_schedule(await http_cache.get_json(schedule_url))
 
+
+# returns the Ducks' home games from the club season schedule payload
+@tracing.traced("parse schedule", team="Ducks")
+def parse_season_schedule(schedule_data):
+    home_games = []
     for row in schedule_data['games']:
-        if row['homeTeam']['id'] == 24 and row['gameDate'] >= today_home:
-            return row['gameDate'], row['awayTeam']['placeName']['default'], row['awayTeam']['commonName']['default']
+        if row['homeTeam']['id'] == 24:
+            opponent = row['awayTeam']['placeName']['default'] + " " + row['awayTeam']['commonName']['default']
+            home_games.append(HomeGame(date.fromisoformat(row['gameDate']), opponent, parse_utc(row.get('startTimeUTC'))))
+    return home_games
+
 
-    return "No upcoming home games found."
+season_schedule = SeasonSchedule("Ducks", load_season_schedule)
+
+
+# Receives the next home game
+async def get_ducks_next_home_game():
+    game = await season_schedule.next_game()
+    if game is None:
+        return None, None
+    return game.date.strftime('%Y-%m-%d'), game.opponent
 
 
 # Checks if there is a ducks home game today
 async def ducks_home_game_today():
-    today = datetime.now(pacific_tz).strftime('%Y-%m-%d')
-    NHL_API_URL: [str] = f"https://api-web.nhle.com/v1/score/{today}"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(NHL_API_URL) as response:
-            data_nhl = await response.json()
-
-    # Check if it was a Ducks home game and they scored 5 points
-    daily_games = data_nhl['games']
-    for i in daily_games:
-        if i['homeTeam']['id'] == 24:
-            logger.debug(i['homeTeam'])
-            logger.debug(i['awayTeam'])
-            logger.debug(i['gameDate'])
-            return True
+    game = await season_schedule.game_on()
+    if game is not None:
+        logger.debug(f"Ducks vs. {game.opponent} on {game.date}")
+        return True
     return False
 
 
 # check if there is an away game today
 async def ducks_away_game_today():
-    today = datetime.now(pacific_tz).strftime('%Y-%m-%d')
-    NHL_API_URL: [str] = f"https://api-web.nhle.com/v1/score/{today}"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(NHL_API_URL) as response:
-            data_nhl = await response.json()
+    data_nhl = await get_scoreboard()
     daily_games = data_nhl['games']
     for i in daily_games:
         if i['awayTeam']['id'] == 24:
@@ -77,12 +83,36 @@ async def ducks_away_game_today():
     return False
 
 
-# returns true if the ducks have scored 5 or more goals including shootouts
+# returns true if the ducks have scored 5 or more goals including shootouts. The game state and score come
+# from today's scoreboard, which get_game_id has usually just fetched, and the much larger play-by-play is
+# only downloaded when the game went to a shootout (or is missing from the scoreboard).
 async def check_ducks_score(game_id):
-    async with aiohttp.ClientSession() as session:
-        async with session.get(f"https://api-web.nhle.com/v1/gamecenter/{game_id}/play-by-play") as response:
-            data_nhl = await response.json()
+    data_nhl = await get_scoreboard()
+    for game in data_nhl['games']:
+        if game['id'] == game_id:
+            result = ducks_score_from_scoreboard(game)
+            if result != "shootout":
+                return result
+            break
+
+    data_nhl = await http_cache.get_json(f"https://api-web.nhle.com/v1/gamecenter/{game_id}/play-by-play")
+    return ducks_score_from_play_by_play(data_nhl)
+
+
+# returns whether the ducks scored 5 or more goals from their game on the scoreboard, or "shootout" when the
+# shootout goals have to be counted from the play-by-play
+@tracing.traced("parse scoreboard", team="Ducks")
+def ducks_score_from_scoreboard(game):
+    if game.get('gameState') not in ('FINAL', 'OFF'):
+        return "The game hasn't finished yet!"
+    if game.get('gameOutcome', {}).get('lastPeriodType') == 'SO':
+        return "shootout"
+    return game['homeTeam']['score'] >= 5
 
+
+# returns whether the ducks scored 5 or more goals from a finished game's play-by-play payload
+@tracing.traced("parse play-by-play", team="Ducks")
+def ducks_score_from_play_by_play(data_nhl):
     # check if the game has started or not
     if len(data_nhl['plays']) != 0:
         if data_nhl['plays'][-1]['typeDescKey'] == 'game-end':
@@ -118,11 +148,7 @@ async def check_ducks_score(game_id):
 
 # For testing the ducks games, checks if the ducks scored 2 points at an away game
 async def check_ducks_away_score():
-    today = datetime.now(pacific_tz).strftime('%Y-%m-%d')
-    NHL_API_URL: [str] = f"https://api-web.nhle.com/v1/score/{today}"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(NHL_API_URL) as response:
-            data_nhl = await response.json()
+    data_nhl = await get_scoreboard()
 
     # Check if it was a Ducks home game and they scored 5 points
     daily_games = data_nhl['games']
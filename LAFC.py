@@ -1,10 +1,16 @@
 import aiohttp
-import requests
-from bs4 import BeautifulSoup
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import NamedTuple
 import pytz
 import logging
 import asyncio
+import os
+import re
+import importlib.util
+
+import http_cache
+import tracing
+from schedules import HomeGame, SeasonSchedule, parse_utc
 
 # Set up logging
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -21,99 +27,63 @@ headers = {
     }
 
 
-# returns the date and opponent of the next scheduled lafc game
-async def get_next_lafc_home_game():
+# downloads the fbref fixtures page and returns the lafc home games
+async def load_season_schedule():
     year = datetime.now(pacific_tz).year
     # URL of the page: eventually this website will need to be changed when the new schedule comes out
     url = (
         f"https://fbref.com/en/squads/81d817a3/{year}/matchlogs/c22/schedule/Los-Angeles-FC-Scores-and-Fixtures-Major"
         "-League-Soccer")
 
-    async with aiohttp.ClientSession(headers=headers) as session:
-        try:
-            async with session.get(url, timeout=10) as response:
-                if response.status == 200:
-                    soup = BeautifulSoup(await response.text(), 'html.parser')
-
-                    # Locate the table with id "matchlogs_for"
-                    table = soup.find('table', {'id': 'matchlogs_for'})
-                    if not table:
-                        logger.debug("Table not found on the page.")
-                        return False
-
-                    rows = table.find_all('tr')[1:]  # Skip the first row
-
-                    today = datetime.now(pacific_tz).date()
-                    # Loop through rows and find the next home game
-                    for row in rows:
-                        # Extract the date of the match
-                        date_str = row.find('th', {'data-stat': 'date'}).text.strip()
-
-                        # checks if there is a blank row indicating a separation for playoff games
-                        if date_str != '':
-                            match_date = datetime.strptime(date_str, "%Y-%m-%d")
-
-                            # Check if the match is in the future
-                            if match_date >= today:
-                                # Extract venue and check if it's a home game
-                                venue = row.find('td', {'data-stat': 'venue'}).text.strip()
-                                if venue.lower() == "home":
-                                    opponent = row.find('td', {'data-stat': 'opponent'}).text.strip()
-                                    return match_date.strftime('%Y-%m-%d'), opponent
-
-                    return "No upcoming LAFC home games found.", None
-                else:
-                    logger.debug(f"Failed to retrieve the page. Status code: {response.status}")
-                    return False
-        except Exception as e:
-            logger.debug(f"Error fetching game data: {e}")
-            return False
+    return parse_season_schedule(await http_cache.get_text(url, headers=headers, timeout=10))
+
+
+# returns the lafc home games from the fbref fixtures page
+@tracing.traced("parse schedule", team="LAFC")
+def parse_season_schedule(html):
+    home_games = []
+    for row in parse_fixture_rows(html):
+        # checks if there is a blank row indicating a separation for playoff games
+        if not row.date:
+            continue
+
+        # Check if it's a home game
+        if row.venue.lower() == "home":
+            match_date = datetime.strptime(row.date, "%Y-%m-%d").date()
+            home_games.append(HomeGame(match_date, row.opponent, parse_kickoff(match_date, row.start_time)))
+    return home_games
+
+
+# converts the venue kickoff time (e.g. "19:30") to a datetime, LAFC home games are played in pacific time
+def parse_kickoff(match_date, start_time):
+    try:
+        kickoff = datetime.strptime(start_time, "%H:%M").time()
+    except ValueError:
+        return None
+    return pacific_tz.localize(datetime.combine(match_date, kickoff))
+
+
+# fbref rate-limits scrapers, so the fixtures are downloaded at most every 6 hours (matching the http_cache
+# freshness of the page) and an expired copy keeps answering while the page is fetched in the background
+SCHEDULE_TTL = 6 * 3600
+season_schedule = SeasonSchedule("LAFC", load_season_schedule, ttl=SCHEDULE_TTL, stale_while_revalidate=True)
+
+
+# returns the date and opponent of the next scheduled lafc game, raising when the fixtures cannot be loaded
+async def get_next_lafc_home_game():
+    game = await season_schedule.next_game()
+    if game is None:
+        return None, None
+    return game.date.strftime('%Y-%m-%d'), game.opponent
 
 
 # returns a boolean if there is a home game today
 async def game_today():
-    year = datetime.now(pacific_tz).year
-    url = (
-        f"https://fbref.com/en/squads/81d817a3/{year}/matchlogs/c22/schedule/Los-Angeles-FC-Scores-and-Fixtures-Major"
-        "-League-Soccer"
-    )
-
-    async with aiohttp.ClientSession(headers=headers) as session:
-        try:
-            async with session.get(url, timeout=10) as response:
-                if response.status == 200:
-                    soup = BeautifulSoup(await response.text(), 'html.parser')
-
-                    # Locate the table with id "matchlogs_for"
-                    table = soup.find('table', {'id': 'matchlogs_for'})
-                    if not table:
-                        logger.debug("Table not found on the page.")
-                        return False
-
-                    rows = table.find_all('tr')[1:]  # Skip the first row
-
-                    today = datetime.now(pacific_tz).date()
-
-                    for row in rows:
-                        date_tag = row.find('th', {'data-stat': 'date'})
-                        if not date_tag or not date_tag.text.strip():
-                            continue  # Skip empty rows
-
-                        match_date = datetime.strptime(date_tag.text.strip(), "%Y-%m-%d").date()
-
-                        if match_date == today:
-                            venue = row.find('td', {'data-stat': 'venue'}).text.strip()
-                            if venue.lower() == "home":
-                                return True
-                        elif match_date > today:
-                            return False
-                    return False
-                else:
-                    logger.debug(f"Failed to retrieve the page. Status code: {response.status}")
-                    return False
-        except Exception as e:
-            logger.debug(f"Error fetching game data: {e}")
-            return False
+    try:
+        return await season_schedule.game_on() is not None
+    except Exception as e:
+        logger.debug(f"Error fetching game data: {e}")
+        return False
 
 
 # returns a string value of the date, time, and opponent of the next lafc home game.
@@ -143,62 +113,162 @@ def upcoming_game(game):
             return f"Next LAFC Home Game:\n\tDate: {date}\n\tOpponent: {opponent}\n\tTime: {time_info}"
 
 
+# football-data.org serves LAFC's matches as JSON. It needs a (free) API token in FOOTBALL_DATA_TOKEN, without
+# one the results are scraped from ESPN as before, which is also the fallback when the API fails. The token is
+# read on each call, since main.py loads the .env file after importing this module.
+FOOTBALL_DATA_TEAM_ID = 740
+FOOTBALL_DATA_URL = f"https://api.football-data.org/v4/teams/{FOOTBALL_DATA_TEAM_ID}/matches"
+
+final_results = {}  # date -> outcome of that day's finished match, which never changes
+
+
 # returns the results of a today's game
 async def get_match_results():
-    url = "https://www.espn.com/soccer/team/results/_/id/18966/usa.lafc"
-
-    async with aiohttp.ClientSession() as session:
+    token = os.getenv("FOOTBALL_DATA_TOKEN")
+    if token:
         try:
-            async with session.get(url, headers=headers, timeout=10) as response:
-                if response.status == 200:
-                    soup = BeautifulSoup(await response.text(), 'html.parser')
-
-                    # Find the table containing the match results
-                    table = soup.find('div', class_='ResponsiveTable Table__results')
-
-                    # Check if the table exists
-                    if not table:
-                        return "No table found on the page."
-
-                    # Extract all rows in the table
-                    rows = table.find_all('tr', class_='Table__TR')[1:]
-
-                    match_data = []
-                    outcome = ""
-
-                    # Loop through each row and extract the relevant data
-                    for row in rows:
-                        # Extract the date
-                        date_str = row.find('div', class_='matchTeams').text.strip()
-
-                        # Parse the date string into a datetime object (current year)
-                        match_date = datetime.strptime(date_str, '%a, %b %d').replace(
-                            year=datetime.now(pacific_tz).year)
-                        today = datetime.now(pacific_tz)
-
-                        # Compare the match date with today's date
-                        if match_date.date() != today.date():
-                            return "The game has not finished yet!"
-
-                        # Extract the team names
-                        teams = row.find_all('a', class_='AnchorLink Table__Team')
-                        home_team = teams[0].text.strip()
-                        away_team = teams[1].text.strip()
-
-                        # Extract the result
-                        result = row.find('span', class_='Table__Team score').text.strip()
-
-                        # Determine the winner and the goal difference
-                        home_score, away_score = map(int, result.split('-'))
-                        if home_score > away_score:
-                            outcome = "Win"
-                        elif home_score < away_score:
-                            outcome = "Lose"
-                        else:
-                            outcome = "Draw"
-
-                    return outcome
-                else:
-                    return f"Failed to retrieve the page. Status code: {response.status}"
+            return await get_football_data_results(token)
         except Exception as e:
-            return f"Error fetching match results: {e}"
+            logger.error(f"Error fetching football-data.org results, falling back to ESPN: {e}")
+    return await get_espn_match_results()
+
+
+# returns the outcome of today's match from football-data.org, only asking for the matches around today
+async def get_football_data_results(token):
+    today = datetime.now(pacific_tz).date()
+    if today in final_results:
+        return final_results[today]
+
+    # an evening kickoff in Los Angeles is already the next day in UTC
+    url = f"{FOOTBALL_DATA_URL}?dateFrom={today.isoformat()}&dateTo={(today + timedelta(days=1)).isoformat()}"
+    data = await http_cache.get_json(url, headers={"X-Auth-Token": token}, timeout=10)
+    outcome = parse_football_data_results(data, today)
+    if outcome in ("Win", "Lose", "Draw"):
+        final_results[today] = outcome
+    return outcome
+
+
+# returns LAFC's outcome of the day's match from a football-data.org matches payload
+@tracing.traced("parse results", team="LAFC")
+def parse_football_data_results(data, day):
+    for match in data.get('matches', []):
+        kickoff = parse_utc(match.get('utcDate'))
+        if kickoff is None or kickoff.astimezone(pacific_tz).date() != day:
+            continue
+        if match['status'] not in ('FINISHED', 'AWARDED'):
+            return "The game has not finished yet!"
+
+        winner = match['score']['winner']
+        if winner == 'DRAW':
+            return "Draw"
+        lafc_side = 'HOME_TEAM' if match['homeTeam']['id'] == FOOTBALL_DATA_TEAM_ID else 'AWAY_TEAM'
+        return "Win" if winner == lafc_side else "Lose"
+    return "The game has not finished yet!"
+
+
+# returns the results of a today's game from the espn results page
+async def get_espn_match_results():
+    url = "https://www.espn.com/soccer/team/results/_/id/18966/usa.lafc"
+
+    try:
+        return parse_match_results(await http_cache.get_text(url, headers=headers, timeout=10))
+    except aiohttp.ClientResponseError as e:
+        return f"Failed to retrieve the page. Status code: {e.status}"
+    except Exception as e:
+        return f"Error fetching match results: {e}"
+
+
+# returns the outcome of today's match from the espn results page
+@tracing.traced("parse results", team="LAFC")
+def parse_match_results(html):
+    try:
+        rows = parse_result_rows(html)
+    except ValueError:
+        return "No table found on the page."
+
+    today = datetime.now(pacific_tz).date()
+    for row in rows:
+        # Parse the date string into a date (current year) and look for today's match
+        match_date = datetime.strptime(row.date, '%a, %b %d').replace(year=today.year).date()
+        if match_date != today:
+            continue
+
+        # Determine the winner from the home team's point of view
+        home_score, away_score = map(int, row.score.split('-'))
+        if home_score > away_score:
+            return "Win"
+        elif home_score < away_score:
+            return "Lose"
+        else:
+            return "Draw"
+    return "The game has not finished yet!"
+
+
+# Targeted parsing for the fbref and espn pages. Both pages are large but only one table is needed, so the
+# table is cut out of the page text first and only its rows are parsed, with the C-backed lxml parser when
+# it is installed. The rows are returned as small records instead of soup objects. bs4 (and lxml) are only
+# imported on the first parse, which keeps them off the startup path.
+HTML_PARSER = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+
+
+class FixtureRow(NamedTuple):
+    date: str
+    start_time: str
+    venue: str
+    opponent: str
+
+
+class ResultRow(NamedTuple):
+    date: str
+    home_team: str
+    away_team: str
+    score: str
+
+
+# returns the html from the tag matching the pattern up to the end of the first table after it, or None
+def extract_table(html, pattern):
+    match = re.search(pattern, html)
+    if not match:
+        return None
+    start = html.rfind("<", 0, match.start())
+    end = html.find("</table>", match.end())
+    return html[start:] if end == -1 else html[start:end + len("</table>")]
+
+
+# parses only the table rows of an html fragment
+def parse_rows(fragment):
+    from bs4 import BeautifulSoup, SoupStrainer
+    return BeautifulSoup(fragment, HTML_PARSER, parse_only=SoupStrainer('tr')).find_all('tr')
+
+
+# returns the rows of the fbref "matchlogs_for" fixtures table
+def parse_fixture_rows(html):
+    table = extract_table(html, r'id=["\']?matchlogs_for\b')
+    if table is None:
+        raise ValueError("Table not found on the page.")
+
+    records = []
+    for row in parse_rows(table)[1:]:  # Skip the header row
+        cells = {cell.get('data-stat'): cell.get_text(strip=True) for cell in row.find_all(('th', 'td'))}
+        records.append(FixtureRow(cells.get('date', ''), cells.get('start_time', '')[:5], cells.get('venue', ''),
+                                  cells.get('opponent', '')))
+    return records
+
+
+# returns the rows of the espn "Table__results" table
+def parse_result_rows(html):
+    table = extract_table(html, r'class=["\']ResponsiveTable Table__results["\']')
+    if table is None:
+        raise ValueError("No table found on the page.")
+
+    records = []
+    rows = [row for row in parse_rows(table) if 'Table__TR' in row.get('class', [])]
+    for row in rows[1:]:  # Skip the header row
+        teams = row.find_all('a', class_='AnchorLink Table__Team')
+        score = row.find('span', class_='Table__Team score')
+        date_tag = row.find('div', class_='matchTeams')
+        if len(teams) < 2 or not score or not date_tag:
+            continue
+        records.append(ResultRow(date_tag.get_text(strip=True), teams[0].get_text(strip=True),
+                                 teams[1].get_text(strip=True), score.get_text(strip=True)))
+    return records
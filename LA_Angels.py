@@ -1,78 +1,77 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date
 import pytz
-import aiohttp  # For asynchronous HTTP requests
-import requests
+
+import http_cache
+import http_session
+import singleflight
+import tracing
+from schedules import HomeGame, SeasonSchedule, parse_utc
 
 pacific_tz = pytz.timezone("America/Los_Angeles")
 
-# returns the date and opponent of the next angels game
-def get_next_angels_game():
+SANDWICH_RUNS = 7  # runs the Angels need at a home game for the free sandwich
+
+# downloads the Angels' schedule for the next year and returns their home games
+async def load_season_schedule():
     # Set up the API URL with the necessary parameters
     team_id = 108  # Los Angeles Angels team ID
     today = datetime.now(pacific_tz)
     next_year = today + timedelta(days=365)
     url = (f"https://statsapi.mlb.com/api/v1/schedule?sportId=1&teamId={team_id}"
            f"&startDate={today.strftime('%Y-%m-%d')}&endDate={next_year.strftime('%Y-%m-%d')}")
-    "2024-09-29"
 
-    # Send a GET request to the API
-    response = requests.get(url)
+    return parse_season_schedule(await http_cache.get_json(url))
+
+
+# returns the Angels' home games from an MLB schedule payload
+@tracing.traced("parse schedule", team="Angels")
+def parse_season_schedule(data):
+    team_id = 108  # Los Angeles Angels team ID
+    home_games = []
+    for date_info in data.get('dates', []):
+        for game in date_info.get('games', []):
+            if (game['teams']['home']['team']['id'] == team_id
+                    and game['status']['detailedState'] not in ('Postponed', 'Cancelled')):
+                opponent_team = game['teams']['away']['team']['name']
+                home_games.append(HomeGame(date.fromisoformat(game['officialDate']), opponent_team,
+                                           parse_utc(game.get('gameDate'))))
+    return home_games
+
 
-    # Check if the request was successful
-    if response.status_code == 200:
-        data = response.json()
+season_schedule = SeasonSchedule("Angels", load_season_schedule)
 
-        # Iterate through the dates and find the first game that is scheduled
-        for date_info in data.get('dates', []):
-            for game in date_info.get('games', []):
-                if (game['status']['detailedState'] == 'Scheduled'
-                        and game['teams']['home']['team']['name'] == 'Los Angeles Angels'):
-                    game_date = game['officialDate']
-                    opponent_team = game['teams']['away']['team']['name'] if game['teams']['home']['team'][
-                                                                                 'id'] == team_id else \
-                        game['teams']['home']['team']['name']
-                    return game_date, opponent_team
 
-        return "No upcoming games found for the Angels."
-    else:
-        return f"Failed to retrieve data. Status code: {response.status_code}"
+# returns the date and opponent of the next angels game
+async def get_next_angels_game():
+    game = await season_schedule.next_game()
+    if game is None:
+        return None, None
+    return game.date.strftime('%Y-%m-%d'), game.opponent
 
 
 # returns a boolean whether there is an angels game today or not
 async def get_today_angels_home_game():
+    return await season_schedule.game_on() is not None
+
+
+# returns today's Angels schedule, shared by every function that reads it within a few seconds
+async def get_today_schedule():
     # Set up the API URL with the necessary parameters
     team_id = 108  # Los Angeles Angels team ID
     today = datetime.now(pacific_tz).strftime('%Y-%m-%d')
     url = f"https://statsapi.mlb.com/api/v1/schedule?sportId=1&teamId={team_id}&startDate={today}&endDate={today}"
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            data_mlb = await response.json()
-
-    # checks if any games exists today
-    if len(data_mlb['dates']) != 0:
-        games = data_mlb.get('dates', [])[0].get('games', [])
-
-        for game in games:
-            # Check if the Angels are playing at home
-            if game['teams']['home']['team']['name'] == "Los Angeles Angels":
-                return True
-        return False
-    else:
-        return False
+    return await singleflight.get_json(url)
 
 
 # returns a boolean if the game is finished and if the angels scored 7 or more at a home game
 async def check_angels_score():
-    # Set up the API URL with the necessary parameters
-    team_id = 108  # Los Angeles Angels team ID
-    today = datetime.now(pacific_tz).strftime('%Y-%m-%d')
-    url = f"https://statsapi.mlb.com/api/v1/schedule?sportId=1&teamId={team_id}&startDate={today}&endDate={today}"
+    return angels_score_from_schedule(await get_today_schedule())
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            data_mlb = await response.json()
 
+# returns whether the Angels' home game in today's schedule payload is finished with 7 or more runs
+@tracing.traced("parse results", team="Angels")
+def angels_score_from_schedule(data_mlb):
     # Extract games from today's schedule
     games = data_mlb.get('dates', [])[0].get('games', [])
 
@@ -91,13 +90,82 @@ async def check_angels_score():
 
 # Returns today's game ID
 async def get_game_id():
-    # Set up the API URL with the necessary parameters
-    team_id = 108  # Los Angeles Angels team ID
-    today = datetime.now(pacific_tz).strftime('%Y-%m-%d')
-    url = f"https://statsapi.mlb.com/api/v1/schedule?sportId=1&teamId={team_id}&startDate={today}&endDate={today}"
-
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            data_mlb = await response.json()
+    data_mlb = await get_today_schedule()
 
     return data_mlb['dates'][0]['games'][0]['gamePk']
+
+
+# Follows one game through the MLB live feed. The first poll downloads the whole feed, later polls ask the
+# diffPatch endpoint for the JSON patches made since the feed's last timecode (an empty list when nothing
+# changed). Only the few values the bot needs are kept: the home runs, the game state and the timecode.
+class LiveFeedTracker:
+    # value -> where it lives in the feed
+    TRACKED = {
+        "runs": ("liveData", "linescore", "teams", "home", "runs"),
+        "state": ("gameData", "status", "abstractGameState"),
+        "timecode": ("metaData", "timeStamp"),
+    }
+
+    def __init__(self, game_pk):
+        self.game_pk = game_pk
+        self.url = f"https://statsapi.mlb.com/api/v1.1/game/{game_pk}/feed/live"
+        self.runs = 0
+        self.state = None
+        self.timecode = None
+
+    @property
+    def final(self):
+        return self.state == "Final"
+
+    async def poll(self):
+        if self.final:
+            return  # The feed is final, nothing left to fetch
+
+        url = self.url if self.timecode is None else f"{self.url}/diffPatch?startTimecode={self.timecode}"
+        with tracing.span("fetch", host="statsapi.mlb.com") as span:
+            async with http_session.get(url) as response:
+                span["status"] = response.status
+                response.raise_for_status()
+                data = await response.json()
+        self.process(data)
+
+    # applies a full feed (the first poll, or when too much changed for a patch) or a list of patches
+    @tracing.traced("parse live feed", team="Angels")
+    def process(self, data):
+        if isinstance(data, dict):
+            self.apply((), data)
+            return
+        for patch in data:
+            for operation in patch.get('diff', []):
+                if operation.get('op') in ('add', 'replace'):
+                    path = tuple(key for key in operation['path'].split('/') if key)
+                    self.apply(path, operation.get('value'))
+
+    # updates every tracked value found in a value written at the path
+    def apply(self, path, value):
+        for name, tracked in self.TRACKED.items():
+            if tracked[:len(path)] != path:
+                continue
+            found = value
+            for key in tracked[len(path):]:
+                found = found.get(key) if isinstance(found, dict) else None
+            if found is not None:
+                setattr(self, name, found)
+
+
+live_trackers = {}
+
+
+# returns the tracker for the game, only the current game is kept
+def get_live_tracker(game_pk):
+    if game_pk not in live_trackers:
+        live_trackers.clear()
+        live_trackers[game_pk] = LiveFeedTracker(game_pk)
+    return live_trackers[game_pk]
+
+
+# brings the game's live feed tracker up to date and returns it
+async def poll_live_game(game_pk):
+    tracker = get_live_tracker(game_pk)
+    await tracker.poll()
+    return tracker
@@ -1,23 +1,43 @@
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import pytz
 import aiohttp
-import requests
-from requests.exceptions import Timeout
-from nba_api.stats.endpoints import leaguegamefinder
-from nba_api.live.nba.endpoints import playbyplay
 import logging
 
+import http_cache
+import http_session
+import tracing
+from schedules import HomeGame, SeasonSchedule, parse_utc
+
 # Set up logging
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
 pacific_tz = pytz.timezone("America/Los_Angeles")
 
+# nba_api only offers blocking calls, so they run on a small dedicated pool instead of the event loop. It also
+# pulls in pandas and takes about half a second to import, so its endpoints are imported inside the blocking
+# functions that use them: the cost is only paid when an nba_api fallback runs, and then on this pool.
+nba_api_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="nba_api")
+
+
+# runs a blocking nba_api call on the bounded nba_api thread pool
+async def run_nba_api(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(nba_api_executor, func, *args)
+
 
-async def fetch_game_data(date):
-    """Fetch game data using nba_api asynchronously."""
+# fetches a game's play-by-play through nba_api (blocking, run it through run_nba_api)
+def get_play_by_play(game_id):
+    from nba_api.live.nba.endpoints import playbyplay
+    return playbyplay.PlayByPlay(game_id=game_id).get_dict()
+
+
+def fetch_game_data(date):
+    """Fetch game data using nba_api (blocking, run it through run_nba_api)."""
     try:
+        from nba_api.stats.endpoints import leaguegamefinder
         gamefinder = leaguegamefinder.LeagueGameFinder(
             team_id_nullable=1610612746,  # Clippers team ID
             date_from_nullable=date,
@@ -35,7 +55,7 @@ async def check_game_finish():
     today_date = datetime.now(pacific_tz).strftime('%m/%d/%Y')
     for attempt in range(3):
         try:
-            games = await asyncio.to_thread(fetch_game_data, today_date)
+            games = await run_nba_api(fetch_game_data, today_date)
             if games is None:
                 continue
             # Filter the games to find a home game
@@ -59,7 +79,8 @@ async def check_live_game():
 
     try:
         # Simple test request to see if the API is reachable
-        games = playbyplay.PlayByPlay(game_id=await get_game_id_today()).get_dict()
+        game_id = await get_game_id_today()
+        games = await run_nba_api(get_play_by_play, game_id)
 
         # Filter the games to find a home game (indicated by 'vs.' in the MATCHUP field)
         clippers_home_game_today = games[games['MATCHUP'].str.contains('vs.')]
@@ -75,8 +96,27 @@ async def check_live_game():
         return None
 
 
-# This is the new function that returns the id if there is a clippers home game today
+# returns the id if there is a clippers home game today. It is read from the indexed league schedule, and
+# stats.nba.com is only asked when the schedule cannot be loaded or has no id for the game.
 async def get_game_id_today():
+    try:
+        game = await season_schedule.game_on()
+    except Exception as e:
+        logger.error(f"Error reading the Clippers schedule, asking stats.nba.com for today's game: {e}")
+    else:
+        if game is None:
+            return None
+        if game.game_id:
+            return game.game_id
+    return await get_game_id_from_broadcaster_schedule()
+
+
+# stats.nba.com is slow and often blocks requests, so it gets a short deadline
+STATS_NBA_TIMEOUT = 10
+
+
+# returns the id of today's clippers home game from the stats.nba.com broadcaster schedule
+async def get_game_id_from_broadcaster_schedule():
     # Fetch the JSON data from the API
     headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
@@ -92,9 +132,7 @@ async def get_game_id_today():
     url = (f"https://stats.nba.com/stats/internationalbroadcasterschedule?LeagueID=00&Season={season}"
            f"&RegionID=1&Date={today}&EST=Y")
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=headers) as response:
-            data = await response.json()
+    data = await http_cache.get_json(url, headers=headers, timeout=STATS_NBA_TIMEOUT)
 
     # Extract the upcoming games
     future_games = data["resultSets"][0]["NextGameList"]
@@ -113,81 +151,138 @@ async def get_game_id_today():
     return None
 
 
-async def check_game_finish_v2(game_id):
-    # Fetch the JSON data from the API
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
-                      "Chrome/91.0.4472.124 Safari/537.36"
-    }
-
-    # URL to fetch the JSON data
-    url = f"https://cdn.nba.com/static/json/liveData/playbyplay/playbyplay_{game_id}.json"
-
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(url, headers=headers) as response:
-                if response.status == 200:
-                    try:
-                        data = await response.json()
-                    except aiohttp.ContentTypeError:
-                        logger.debug("Response is not JSON. Access might be denied.")
-                        return None
-
-                    # Extract the play by plays
-                    play_by_plays = data["game"]["actions"]
-
-                    # Find the last element to determine if the game has ended
-                    if play_by_plays[-1]["description"] == 'Game End':
-                        return True
-                    else:
-                        return False
-                else:
+nba_headers = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+                  "Chrome/91.0.4472.124 Safari/537.36"
+}
+
+
+# Follows one game's live play-by-play feed. Each poll downloads the feed at most once (a 304 when nothing
+# changed), only evaluates actions newer than the last processed actionNumber, and keeps both the
+# "game ended" and "opponent missed a final free throw in the 4th quarter" answers up to date.
+class PlayByPlayTracker:
+    def __init__(self, game_id):
+        self.game_id = game_id
+        self.url = f"https://cdn.nba.com/static/json/liveData/playbyplay/playbyplay_{game_id}.json"
+        self.etag = None
+        self.last_modified = None
+        self.last_action_number = 0
+        self.game_ended = False
+        self.opponent_missed_ft = False
+
+    # fetches the feed if it changed, returns False if it is unavailable and None if access was denied
+    async def poll(self):
+        if self.game_ended:
+            return True  # The feed is final, nothing left to fetch
+
+        request_headers = dict(nba_headers)
+        if self.etag:
+            request_headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            request_headers["If-Modified-Since"] = self.last_modified
+
+        with tracing.span("fetch", host="cdn.nba.com") as span:
+            async with http_session.get(self.url, headers=request_headers) as response:
+                span["status"] = response.status
+                if response.status == 304:
+                    return True
+                if response.status != 200:
                     logger.debug("The page was not available, the game hasn't finished yet!")
                     return False
-        except Exception as e:
-            print(f"Error occurred: {e}")
-            return None
+                try:
+                    data = await response.json()
+                except aiohttp.ContentTypeError:
+                    logger.debug("Response is not JSON. Access might be denied.")
+                    return None
+                self.etag = response.headers.get("ETag")
+                self.last_modified = response.headers.get("Last-Modified")
+
+        self.process(data["game"]["actions"])
+        return True
+
+    # evaluates the actions that were not seen on a previous poll
+    @tracing.traced("parse play-by-play", team="Clippers")
+    def process(self, actions):
+        for action in actions:
+            action_number = action.get('actionNumber', 0)
+            if action_number <= self.last_action_number:
+                continue
+            self.last_action_number = action_number
+
+            if action.get('actionType') == 'game' and action.get('subType') == 'end':
+                self.game_ended = True
+
+            # the opponent missed the last free throw of a trip to the line in the 4th quarter
+            if (action.get('period') == 4 and action.get('actionType') == 'freethrow'
+                    and action.get('shotResult') == 'Missed'
+                    and action.get('subType') in ('2 of 2', '2 of 3', '3 of 3')
+                    and action.get('teamTricode') != 'LAC'):
+                self.opponent_missed_ft = True
+
+
+pbp_trackers = {}
+
+
+# returns the tracker for the game, only the current game is kept
+def get_pbp_tracker(game_id):
+    if game_id not in pbp_trackers:
+        pbp_trackers.clear()
+        pbp_trackers[game_id] = PlayByPlayTracker(game_id)
+    return pbp_trackers[game_id]
+
+
+# Returns True once the game has ended, False while it is still going and None if the feed could not be read
+async def check_game_finish_v2(game_id):
+    tracker = get_pbp_tracker(game_id)
+    try:
+        polled = await tracker.poll()
+    except Exception as e:
+        logger.error(f"Error reading the Clippers play-by-play: {e}")
+        return None
+    if not polled:
+        return polled
+    return tracker.game_ended
 
 
-# finds the next clippers home game parsing through a json file
-def get_next_clippers_home_game():
+# downloads the league schedule json file and returns the clippers home games
+async def load_season_schedule():
     # URL for the NBA schedule JSON data
     url = "https://cdn.nba.com/static/json/staticData/scheduleLeagueV2.json"
 
-    try:
-        # Fetch the JSON data
-        response = requests.get(url)
-        response.raise_for_status()  # Ensure the request was successful
+    return parse_season_schedule(await http_cache.get_json(url))
+
 
-        # Parse the JSON content
-        data = response.json()
+# returns the clippers home games from the league schedule payload
+@tracing.traced("parse schedule", team="Clippers")
+def parse_season_schedule(data):
+    home_games = []
+    for game_date in data['leagueSchedule']['gameDates']:
+        # Parse the date part only, e.g., '10/05/2024 00:00:00'
+        game_date_only = datetime.strptime(game_date.get('gameDate'), '%m/%d/%Y %H:%M:%S').date()
 
-        # Example: Extracting all games
-        games = data['leagueSchedule']['gameDates']
+        for game in game_date['games']:
+            if game['homeTeam']['teamName'] == "Clippers":
+                away_team = game['awayTeam']['teamCity'] + " " + game['awayTeam']['teamName']
+                home_games.append(HomeGame(game_date_only, away_team, parse_utc(game.get('gameDateTimeUTC')),
+                                           game.get('gameId')))
+    return home_games
 
-        for game_date in games:
-            # Parse and reformat the date
-            original_date = game_date.get('gameDate')  # e.g., '10/05/2024 00:00:00'
-            game_datetime = datetime.strptime(original_date, '%m/%d/%Y %H:%M:%S')  # Convert to datetime object
 
-            # Get the date part only
-            game_date_only = game_datetime.date()
+season_schedule = SeasonSchedule("Clippers", load_season_schedule)
 
-            for game in game_date['games']:
-                if (game['homeTeam']['teamName'] == "Clippers"
-                        and game_date_only >= datetime.now().date()):
-                    away_team = game['awayTeam']['teamCity'] + " " + game['awayTeam']['teamName']
-                    formatted_date = datetime.strptime(original_date, '%m/%d/%Y %H:%M:%S').strftime('%Y-%m-%d')
-                    return formatted_date, away_team
 
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching data: {e}")
+# finds the next clippers home game from the indexed league schedule
+async def get_next_clippers_home_game():
+    game = await season_schedule.next_game()
+    if game is None:
+        return None, None
+    return game.date.strftime('%Y-%m-%d'), game.opponent
 
 
 async def fetch_play_by_play_data(game_id):
-    """Fetch game data using nba_api asynchronously."""
+    """Fetch game data using nba_api on the nba_api thread pool."""
     try:
-        pbp = playbyplay.PlayByPlay(game_id=game_id).get_dict()
+        pbp = await run_nba_api(get_play_by_play, game_id)
         events = pbp['game']['actions']
         return events
     except Exception as e:
@@ -197,9 +292,9 @@ async def fetch_play_by_play_data(game_id):
 
 # This function displays the current games that are going on right now with live updates.
 # It will send a message if the opponents of the opponents missed 2 free throws in a row in the 4th quarter.
-# THIS FUNCTION IS USES THE BUILT-IN API FOR PYTHON
+# THIS FUNCTION IS USES THE BUILT-IN API FOR PYTHON (blocking, call it through run_nba_api from async code)
 def check_opponent_missed_two_ft_in_4th_quarter(game_id):
-    pbp = playbyplay.PlayByPlay(game_id=game_id).get_dict()
+    pbp = get_play_by_play(game_id)
     events = pbp['game']['actions']
 
     for event in events:
@@ -221,44 +316,15 @@ def check_opponent_missed_two_ft_in_4th_quarter(game_id):
 
 # This function displays the current games that are going on right now with live updates.
 # It will send a message if the opponents of the opponents missed 2 free throws in a row in the 4th quarter.
-# THIS USES A URL TO GET THE CURRENT PLAY BY PLAYS
+# THIS USES A URL TO GET THE CURRENT PLAY BY PLAYS, answered from the tracker when the feed was already read
 async def check_missed_ft_in_4th_quarter_v2(game_id):
-    # Fetch the JSON data from the API
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
-                      "Chrome/91.0.4472.124 Safari/537.36"
-    }
-
-    # URL to fetch the JSON data
-    url = f"https://cdn.nba.com/static/json/liveData/playbyplay/playbyplay_{game_id}.json"
-
-    async with aiohttp.ClientSession() as session:
+    tracker = get_pbp_tracker(game_id)
+    if not tracker.game_ended:
         try:
-            async with session.get(url, headers=headers) as response:
-                if response.status == 200:
-                    try:
-                        data = await response.json()
-                    except aiohttp.ContentTypeError:
-                        logger.debug("Response is not JSON. Access might be denied.")
-                        return None
-
-                    # Extract the play by plays
-                    events = data["game"]["actions"]
-
-                    for event in reversed(events):
-                        period = event.get('period', 0)
-                        description = event.get('description', '')
-                        team_abbreviation = event.get('teamTricode', '')
-
-                        # We are only interested in the 4th quarter (period 4)
-                        if period == 4:
-                            # Check for missed free throw events by the opponent
-                            if ('MISS' in description and 'Free Throw' in description
-                                    and ('2 of 2' in description or '2 of 3' in description
-                                         or '3 of 3' in description)):
-                                if team_abbreviation != 'LAC':
-                                    return True
-                    return False
+            polled = await tracker.poll()
         except Exception as e:
-            print(f"Error occurred: {e}")
+            logger.error(f"Error reading the Clippers play-by-play: {e}")
+            return None
+        if polled is None:
             return None
+    return tracker.opponent_missed_ft
@@ -0,0 +1,348 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+# Offline benchmark of a polling cycle. Every upstream request is redirected to a local stand-in server
+# that replays the payloads from benchmark_fixtures, and the script reports latency percentiles, peak
+# traced allocations and peak RSS for game discovery, one polling cycle, each chat command and each
+# parser on its own. Startup is measured in fresh interpreters: the time until on_ready has finished
+# (without connecting to Discord) and the import cost of each module main.py imports.
+#
+#   python benchmark.py                      # everything, 20 iterations
+#   python benchmark.py --only parse -n 50   # only rows whose name contains "parse"
+#   python benchmark.py --only startup       # only the startup rows
+#   python benchmark.py --json results.json  # also save the numbers for later comparison
+
+# main.py reads these at import time, and the benchmark must never touch the real HTTP cache, subscriptions,
+# trace log or poller state
+os.environ.setdefault("DISCORD_TOKEN", "benchmark")
+os.environ.setdefault("DISCORD_CHANNEL_ID", "0")
+os.environ.setdefault("FOOTBALL_DATA_TOKEN", "benchmark")
+bench_dir = tempfile.mkdtemp(prefix="chickbot-bench-")
+os.environ["HTTP_CACHE_PATH"] = os.path.join(bench_dir, "http_cache.sqlite3")
+os.environ["SUBSCRIPTIONS_PATH"] = os.path.join(bench_dir, "subscriptions.json")
+os.environ["TRACE_PATH"] = os.path.join(bench_dir, "trace.jsonl")
+os.environ["LOOP_REPORT_PATH"] = os.path.join(bench_dir, "loop_report.json")
+os.environ["POLLER_STATE_PATH"] = os.path.join(bench_dir, "poller_state.json")
+logging.disable(logging.CRITICAL)  # main.py and discord log at import time
+
+from aiohttp import web  # noqa: E402
+from bs4 import BeautifulSoup  # noqa: E402
+
+import Anaheim_Ducks  # noqa: E402
+import LAFC  # noqa: E402
+import LA_Angels  # noqa: E402
+import LA_Clippers  # noqa: E402
+import benchmark_fixtures  # noqa: E402
+import http_cache  # noqa: E402
+import http_session  # noqa: E402
+import main  # noqa: E402
+import outbox  # noqa: E402
+import responses  # noqa: E402
+import singleflight  # noqa: E402
+import subscriptions  # noqa: E402
+
+UPSTREAMS = [
+    "https://cdn.nba.com",
+    "https://stats.nba.com",
+    "https://api-web.nhle.com",
+    "https://statsapi.mlb.com",
+    "https://fbref.com",
+    "https://www.espn.com",
+    "https://api.football-data.org",
+]
+FANOUT_CHANNELS = 200  # subscribed channels in the fan-out benchmark
+STARTUP_RUNS = 10  # fresh interpreters started per startup row, at most
+COMMANDS = ["hello", "roll dice", "next chance", "next clippers game", "next ducks game", "next lafc game",
+            "next angels game"]
+
+
+# channel stand-in that accepts messages without talking to Discord
+class FakeChannel:
+    def __init__(self, channel_id):
+        self.id = channel_id
+        self.sent = []
+
+    async def send(self, content, delete_after=None):
+        self.sent.append(content)
+
+
+# serves the fixtures on a random local port and points every upstream origin at it
+async def start_stand_in(fixtures):
+    async def handle(request):
+        found = fixtures.lookup(request.match_info["host"], "/" + request.match_info["path"], request.query_string)
+        if found is None:
+            return web.Response(status=404)
+        content_type, body = found
+        return web.Response(body=body, content_type=content_type)
+
+    app = web.Application()
+    app.router.add_get("/{host}/{path:.*}", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    for origin in UPSTREAMS:
+        http_session.url_overrides[origin] = f"http://127.0.0.1:{port}/{origin.split('://')[1]}"
+    return runner
+
+
+# forgets everything that was downloaded, so the next call pays for the full fetch and parse
+def reset_caches():
+    http_cache.clear()
+    singleflight.clear()
+    for schedule in main.TEAM_SCHEDULES.values():
+        schedule.clear()
+    LA_Clippers.pbp_trackers.clear()
+    LA_Angels.live_trackers.clear()
+    LAFC.final_results.clear()
+    responses.next_chance_answer = None
+
+
+# puts every team poller back at the start of a new day, before discovery and announcements
+def reset_day():
+    for state in main.team_states.values():
+        state.day = None
+
+
+# discovers today's game for every team at once, the way the poller tasks do at the start of a day
+async def discover_every_team():
+    today = datetime.now(main.pacific_tz).date()
+    await asyncio.gather(*(main.discover(state, today) for state in main.team_states.values()))
+
+
+# polls every team once, the way their poller tasks would, and waits for the messages to leave the outbox
+async def poll_every_team():
+    delays = await asyncio.gather(*(main.poll_once(state) for state in main.team_states.values()))
+    await outbox.flush()
+    return min(delays)
+
+
+async def call(func):
+    result = func()
+    if asyncio.isfuture(result) or asyncio.iscoroutine(result):
+        result = await result
+    return result
+
+
+def result_row(name, timings, peak_alloc=0):
+    quantiles = statistics.quantiles(timings, n=100, method="inclusive") if len(timings) > 1 else timings * 99
+    return {
+        "name": name,
+        "iterations": len(timings),
+        "p50_ms": quantiles[49],
+        "p90_ms": quantiles[89],
+        "p99_ms": quantiles[98],
+        "max_ms": max(timings),
+        "peak_alloc_kb": peak_alloc / 1024,
+    }
+
+
+# times func over the iterations, then runs it once more under tracemalloc for its peak allocation
+async def measure(name, func, iterations, reset=None):
+    timings = []
+    for _ in range(iterations):
+        if reset:
+            reset()
+        started = time.perf_counter()
+        await call(func)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    if reset:
+        reset()
+    tracemalloc.start()
+    await call(func)
+    peak_alloc = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result_row(name, timings, peak_alloc)
+
+
+# run in a fresh interpreter: imports main and goes through setup_hook and on_ready without connecting to
+# Discord, then prints how long each step took in milliseconds
+STARTUP_SCRIPT = """
+import asyncio, json, os, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+async def start():
+    await main.client.setup_hook()
+    hooked = time.perf_counter()
+    await main.on_ready()
+    return hooked
+
+hooked = asyncio.new_event_loop().run_until_complete(start())
+ready = time.perf_counter()
+print(json.dumps({"imports": imported - started, "setup_hook": hooked - imported, "on_ready": ready - hooked}))
+os._exit(0)
+"""
+
+
+# returns the cumulative import time in milliseconds of each module main.py imports directly, from the
+# -X importtime output of "import main". A dependency shared by several modules is charged to the first
+# module that imports it.
+def main_import_times(importtime_output):
+    children = {}
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0:
+            if name.strip() == "main":
+                children["main"] = int(cumulative) / 1000
+                return children
+            children = {}
+        elif depth == 1:
+            children[name.strip()] = int(cumulative) / 1000
+    return {}
+
+
+# starts the bot in fresh interpreters with the health server on a random port, and measures the time until
+# on_ready has finished and what each import costs
+def startup_cases(runs):
+    env = dict(os.environ, PORT="0", TRACING="0")
+    process_timings, step_timings, import_timings = [], {}, {}
+    for _ in range(runs):
+        started = time.perf_counter()
+        finished = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], env=env, capture_output=True, text=True,
+                                  check=True)
+        process_timings.append((time.perf_counter() - started) * 1000)
+        for step, seconds in json.loads(finished.stdout.splitlines()[-1]).items():
+            step_timings.setdefault(step, []).append(seconds * 1000)
+
+        imported = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], env=env,
+                                  capture_output=True, text=True, check=True)
+        for module, milliseconds in main_import_times(imported.stderr).items():
+            import_timings.setdefault(module, []).append(milliseconds)
+
+    results = [result_row("startup: process start to on_ready done", process_timings)]
+    results += [result_row(f"startup: {step}", timings) for step, timings in step_timings.items()]
+    results += [result_row(f"startup: import {module}", timings)
+                for module, timings in sorted(import_timings.items(), key=lambda item: -statistics.median(item[1]))]
+    return results
+
+
+def parser_cases(fixtures):
+    nba_schedule = fixtures.body("cdn.nba.com", "/static/json/staticData/scheduleLeagueV2.json")
+    nba_pbp = fixtures.body("cdn.nba.com", f"/static/json/liveData/playbyplay/playbyplay_"
+                                           f"{benchmark_fixtures.CLIPPERS_GAME_ID}.json")
+    nhl_schedule = fixtures.body("api-web.nhle.com", "/v1/club-schedule-season/ANA/now")
+    nhl_pbp = fixtures.body("api-web.nhle.com", f"/v1/gamecenter/{benchmark_fixtures.DUCKS_GAME_ID}/play-by-play")
+    nhl_score = fixtures.body("api-web.nhle.com", "/v1/score/2000-01-01")
+    mlb_season = fixtures.body("statsapi.mlb.com", "/api/v1/schedule")
+    mlb_today = fixtures.lookup("statsapi.mlb.com", "/api/v1/schedule", "startDate=2000-01-01&endDate=2000-01-01")[1]
+    mlb_feed = fixtures.body("statsapi.mlb.com", f"/api/v1.1/game/{benchmark_fixtures.ANGELS_GAME_PK}/feed/live")
+    mlb_patch = fixtures.body("statsapi.mlb.com",
+                              f"/api/v1.1/game/{benchmark_fixtures.ANGELS_GAME_PK}/feed/live/diffPatch")
+    fbref = fixtures.body("fbref.com", "/en/squads/81d817a3/schedule").decode()
+    espn = fixtures.body("www.espn.com", "/soccer/team/results/_/id/18966/usa.lafc").decode()
+    football_data = fixtures.body("api.football-data.org", "/v4/teams/740/matches")
+
+    return [
+        ("parse nba schedule", lambda: LA_Clippers.parse_season_schedule(json.loads(nba_schedule))),
+        ("parse nba play-by-play", lambda: LA_Clippers.PlayByPlayTracker("0").process(
+            json.loads(nba_pbp)["game"]["actions"])),
+        ("parse nhl schedule", lambda: Anaheim_Ducks.parse_season_schedule(json.loads(nhl_schedule))),
+        ("parse nhl scoreboard", lambda: Anaheim_Ducks.ducks_score_from_scoreboard(json.loads(nhl_score)["games"][0])),
+        ("parse nhl play-by-play", lambda: Anaheim_Ducks.ducks_score_from_play_by_play(json.loads(nhl_pbp))),
+        ("parse mlb schedule", lambda: LA_Angels.parse_season_schedule(json.loads(mlb_season))),
+        ("parse mlb today", lambda: LA_Angels.angels_score_from_schedule(json.loads(mlb_today))),
+        ("parse mlb live feed", lambda: LA_Angels.LiveFeedTracker(0).process(json.loads(mlb_feed))),
+        ("parse mlb live feed patch", lambda: LA_Angels.LiveFeedTracker(0).process(json.loads(mlb_patch))),
+        ("parse fbref fixtures", lambda: LAFC.parse_season_schedule(fbref)),
+        ("parse espn results", lambda: LAFC.parse_match_results(espn)),
+        ("parse football-data results", lambda: LAFC.parse_football_data_results(
+            json.loads(football_data), datetime.now(LAFC.pacific_tz).date())),
+        # what the scrapers did before the targeted parsing, kept to show the difference
+        ("parse fbref fixtures (full html.parser tree)", lambda: BeautifulSoup(fbref, "html.parser").find(
+            "table", {"id": "matchlogs_for"}).find_all("tr")),
+        ("parse espn results (full html.parser tree)", lambda: BeautifulSoup(espn, "html.parser").find(
+            "table", class_="ResponsiveTable Table__results")),
+    ]
+
+
+async def run(iterations, only):
+    # the fake channel has no rate limit, and Discord's would dominate the cycle timings
+    outbox.set_rate_limits((10 ** 6, 1.0), (10 ** 6, 1.0))
+    fixtures = benchmark_fixtures.Fixtures()
+    runner = await start_stand_in(fixtures)
+    channels = {channel_id: FakeChannel(channel_id) for channel_id in range(1, FANOUT_CHANNELS + 1)}
+    main.client.get_channel = channels.get
+    subscriptions.subscribe(1, None, subscriptions.TEAMS)
+
+    def reset_cold():
+        reset_caches()
+        reset_day()
+
+    # subscribes the rest of the stand-in channels, so one cycle's messages go to every one of them
+    def reset_fanout():
+        if len(subscriptions.channels_for("LAFC")) < FANOUT_CHANNELS:
+            for channel_id in channels:
+                subscriptions.subscribe(channel_id, None, subscriptions.TEAMS)
+        reset_cold()
+
+    cases = [
+        ("discover every team (cold)", discover_every_team, reset_caches),
+        ("discover every team (warm)", discover_every_team, None),
+        ("poll every team (cold)", poll_every_team, reset_cold),
+        ("poll every team (warm)", poll_every_team, reset_day),
+    ]
+    for command in COMMANDS:
+        cases.append((f"get_response {command!r} (cold)", lambda c=command: responses.get_response(c, "<@0>"),
+                      reset_caches))
+        cases.append((f"get_response {command!r} (warm)", lambda c=command: responses.get_response(c, "<@0>"), None))
+    cases.append(("get_response 'next chance' x100 concurrent (warm)", lambda: asyncio.gather(
+        *(responses.get_response("next chance", "<@0>") for _ in range(100))), None))
+    cases += [(name, func, None) for name, func in parser_cases(fixtures)]
+    cases.append((f"poll every team, fan-out to {FANOUT_CHANNELS} channels (cold)", poll_every_team,
+                  reset_fanout))
+
+    results = []
+    try:
+        for name, func, reset in cases:
+            if only and only not in name:
+                continue
+            results.append(await measure(name, func, iterations, reset))
+    finally:
+        await http_session.close_session()
+        await runner.cleanup()
+    return results
+
+
+def report(results):
+    print(f"{'benchmark':<52} {'n':>4} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9} {'peak KB':>10}")
+    for row in results:
+        print(f"{row['name']:<52} {row['iterations']:>4} {row['p50_ms']:>9.2f} {row['p90_ms']:>9.2f} "
+              f"{row['p99_ms']:>9.2f} {row['max_ms']:>9.2f} {row['peak_alloc_kb']:>10.1f}")
+    # ru_maxrss is reported in kilobytes on Linux
+    print(f"peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Offline benchmark of the bot's polling and chat paths")
+    parser.add_argument("-n", "--iterations", type=int, default=20)
+    parser.add_argument("--only", help="only run benchmarks whose name contains this text")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    benchmark_results = asyncio.run(run(args.iterations, args.only))
+    if not args.only or args.only in "startup: import" or args.only.startswith("startup"):
+        benchmark_results += [row for row in startup_cases(min(args.iterations, STARTUP_RUNS))
+                              if not args.only or args.only in row["name"]]
+    report(benchmark_results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"results": benchmark_results,
+                       "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}, f, indent=2)
@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+
+# benchmark points the HTTP cache, subscriptions, trace log and poller state at a temp dir before the bot
+# modules are imported, and its stand-in server replays benchmark_fixtures for every upstream
+import benchmark
+import benchmark_fixtures
+import http_session
+
+
+@pytest.fixture(scope="session")
+def fixtures():
+    return benchmark_fixtures.Fixtures()
+
+
+# runs a coroutine function on a fresh loop with every upstream redirected to the stand-in server, starting
+# from empty caches
+@pytest.fixture
+def stand_in(fixtures):
+    def run(scenario, served=None):
+        async def main():
+            runner = await benchmark.start_stand_in(served or fixtures)
+            try:
+                return await scenario()
+            finally:
+                await http_session.close_session()
+                await runner.cleanup()
+                http_session.url_overrides.clear()
+
+        benchmark.reset_caches()
+        return asyncio.run(main())
+
+    return run
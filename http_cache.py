@@ -0,0 +1,164 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+
+import http_session
+import tracing
+
+# Persistent HTTP cache shared by the team modules. Responses are stored in SQLite keyed by URL together
+# with their ETag, Last-Modified and fetch time, so a restart starts warm: fresh entries are served
+# without touching the network and stale ones are revalidated with a conditional request (a 304 instead
+# of a full download).
+
+logger = logging.getLogger(__name__)
+
+CACHE_PATH = os.getenv("HTTP_CACHE_PATH", "http_cache.sqlite3")
+
+# seconds a cached response is served without revalidation, first matching pattern wins
+FRESHNESS_RULES = [
+    (re.compile(r"^https://cdn\.nba\.com/static/json/staticData/"), 6 * 3600),  # league schedule
+    (re.compile(r"^https://api-web\.nhle\.com/v1/club-schedule-season/"), 6 * 3600),  # season schedule
+    (re.compile(r"^https://statsapi\.mlb\.com/api/v1/schedule\?.*&startDate=(?P<d>[\d-]+)&endDate=(?!(?P=d)\b)"),
+     6 * 3600),  # multi-day schedule range
+    (re.compile(r"^https://fbref\.com/"), 6 * 3600),  # fixtures page
+    (re.compile(r"^https://stats\.nba\.com/"), 300),
+    (re.compile(r"^https://api-web\.nhle\.com/v1/(score|gamecenter)/"), 20),  # live scores
+    (re.compile(r"^https://statsapi\.mlb\.com/"), 20),  # today's schedule and scores
+    (re.compile(r"^https://api\.football-data\.org/"), 60),  # match results, the free tier allows 10 requests/min
+    (re.compile(r"^https://www\.espn\.com/"), 60),  # match results
+]
+
+# Several cached URLs contain the date (today's scores and schedules, date ranges), so each day adds new rows.
+# Entries that were neither downloaded nor revalidated for MAX_AGE seconds are deleted when the cache is
+# opened and then at most once every PRUNE_INTERVAL, which keeps the file from growing without bound.
+MAX_AGE = 3 * 86400
+PRUNE_INTERVAL = 86400
+
+stats = {
+    "hits": 0,  # served from the cache without a request
+    "misses": 0,  # not cached, downloaded in full
+    "revalidations": 0,  # stale entry confirmed unchanged by a 304
+    "refreshes": 0,  # stale entry replaced by a full download
+}
+
+_connection = None
+_db_lock = threading.Lock()
+_pruned_at = 0.0
+
+
+def _db():
+    global _connection
+    if _connection is None:
+        _connection = sqlite3.connect(CACHE_PATH, check_same_thread=False)
+        _connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "url TEXT PRIMARY KEY, body BLOB, etag TEXT, last_modified TEXT, fetched_at REAL)"
+        )
+        _connection.commit()
+        _prune(time.time())
+    return _connection
+
+
+# deletes the entries older than MAX_AGE, called with _db_lock held
+def _prune(now):
+    global _pruned_at
+    _pruned_at = now
+    removed = _connection.execute("DELETE FROM responses WHERE fetched_at < ?", (now - MAX_AGE,)).rowcount
+    _connection.commit()
+    if removed:
+        logger.debug(f"Pruned {removed} HTTP cache entries older than {MAX_AGE / 86400:.0f} days")
+
+
+def _load(url):
+    with _db_lock:
+        return _db().execute(
+            "SELECT body, etag, last_modified, fetched_at FROM responses WHERE url = ?", (url,)
+        ).fetchone()
+
+
+def _store(url, body, etag, last_modified, fetched_at):
+    with _db_lock:
+        _db().execute(
+            "INSERT OR REPLACE INTO responses (url, body, etag, last_modified, fetched_at) VALUES (?, ?, ?, ?, ?)",
+            (url, body, etag, last_modified, fetched_at)
+        )
+        _db().commit()
+        if fetched_at - _pruned_at > PRUNE_INTERVAL:
+            _prune(fetched_at)
+
+
+def _touch(url, fetched_at):
+    with _db_lock:
+        _db().execute("UPDATE responses SET fetched_at = ? WHERE url = ?", (fetched_at, url))
+        _db().commit()
+
+
+# returns how many seconds a response for the url stays fresh
+def freshness(url):
+    for pattern, seconds in FRESHNESS_RULES:
+        if pattern.search(url):
+            return seconds
+    return 0
+
+
+# returns the response body for the url, from the cache when it is fresh or unchanged upstream
+async def get_bytes(url, headers=None, **kwargs):
+    with tracing.span("fetch", host=urlsplit(url).hostname) as span:
+        cached = await asyncio.to_thread(_load, url)
+        now = time.time()
+        if cached is not None and now - cached[3] < freshness(url):
+            stats["hits"] += 1
+            span["cache"] = "hit"
+            return cached[0]
+
+        request_headers = dict(headers or {})
+        if cached is not None:
+            if cached[1]:
+                request_headers["If-None-Match"] = cached[1]
+            if cached[2]:
+                request_headers["If-Modified-Since"] = cached[2]
+
+        async with http_session.get(url, headers=request_headers, **kwargs) as response:
+            if response.status == 304 and cached is not None:
+                stats["revalidations"] += 1
+                span["cache"] = "revalidated"
+                await asyncio.to_thread(_touch, url, now)
+                return cached[0]
+            response.raise_for_status()
+            body = await response.read()
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+
+        stats["misses" if cached is None else "refreshes"] += 1
+        span["cache"] = "miss" if cached is None else "refresh"
+        span["bytes"] = len(body)
+        await asyncio.to_thread(_store, url, body, etag, last_modified, now)
+        return body
+
+
+async def get_text(url, headers=None, **kwargs):
+    return (await get_bytes(url, headers, **kwargs)).decode("utf-8", errors="replace")
+
+
+async def get_json(url, headers=None, **kwargs):
+    return json.loads(await get_bytes(url, headers, **kwargs))
+
+
+# drops every cached response
+def clear():
+    with _db_lock:
+        _db().execute("DELETE FROM responses")
+        _db().commit()
+
+
+# returns the hit, miss and revalidation counts along with the hit rate
+def get_stats():
+    requests_seen = sum(stats.values())
+    hit_rate = (stats["hits"] + stats["revalidations"]) / requests_seen if requests_seen else 0.0
+    return dict(stats, hit_rate=hit_rate)
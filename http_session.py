@@ -0,0 +1,77 @@
+import asyncio
+import logging
+
+import aiohttp
+
+# One pooled HTTP client shared by every team module. It is opened when the bot becomes ready and closed
+# when the client shuts down, so polls reuse warm TCP/TLS connections and cached DNS lookups instead of
+# paying for a new handshake on every request.
+
+logger = logging.getLogger(__name__)
+
+# connection pool limits and timeouts used for every upstream request
+POOL_LIMIT = 20
+POOL_LIMIT_PER_HOST = 4
+DNS_CACHE_SECONDS = 300
+KEEPALIVE_SECONDS = 60
+DEFAULT_TIMEOUT = aiohttp.ClientTimeout(total=30, connect=10, sock_read=20)
+
+# aiohttp.TraceConfig instances attached to the session when it is created (metrics.py)
+trace_configs = []
+
+# upstream origin -> replacement prefix, used to point every request at a local stand-in server (benchmark.py)
+url_overrides = {}
+
+_session = None
+_session_lock = asyncio.Lock()
+
+
+def _create_session():
+    connector = aiohttp.TCPConnector(
+        limit=POOL_LIMIT,
+        limit_per_host=POOL_LIMIT_PER_HOST,
+        ttl_dns_cache=DNS_CACHE_SECONDS,
+        keepalive_timeout=KEEPALIVE_SECONDS,
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=DEFAULT_TIMEOUT, trace_configs=list(trace_configs))
+
+
+# opens the shared session, safe to call more than once (on_ready fires again after a reconnect)
+async def open_session():
+    global _session
+    async with _session_lock:
+        if _session is None or _session.closed:
+            _session = _create_session()
+            logger.debug("Opened shared HTTP session")
+    return _session
+
+
+# closes the shared session and its pooled connections
+async def close_session():
+    global _session
+    async with _session_lock:
+        if _session is not None and not _session.closed:
+            await _session.close()
+            logger.debug("Closed shared HTTP session")
+        _session = None
+
+
+# returns the shared session, creating it on first use so the team modules also work outside the bot
+def get_session():
+    global _session
+    if _session is None or _session.closed:
+        _session = _create_session()
+    return _session
+
+
+# returns the url with its origin replaced when an override is registered for it
+def rewrite_url(url):
+    for origin, replacement in url_overrides.items():
+        if url.startswith(origin):
+            return replacement + url[len(origin):]
+    return url
+
+
+# issues a GET through the shared session; use as "async with http_session.get(url) as response:"
+def get(url, **kwargs):
+    return get_session().get(rewrite_url(url), **kwargs)
@@ -0,0 +1,19 @@
+import json
+import os
+import tempfile
+
+
+# writes the data as JSON to a temporary file next to the path and swaps it in, so a crash never leaves a
+# half-written file behind. Raises OSError when the file cannot be written.
+def write_atomic(path, data, **dump_kwargs):
+    directory = os.path.dirname(os.path.abspath(path))
+    name, extension = os.path.splitext(os.path.basename(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{name}-", suffix=extension)
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, **dump_kwargs)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
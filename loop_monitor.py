@@ -0,0 +1,131 @@
+import asyncio
+import datetime
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import defaultdict, deque
+
+import json_files
+
+# Event-loop lag sampler and blocking-call detector. A heartbeat task on the loop records how late each of
+# its short sleeps wakes up. A watchdog thread checks the heartbeat, and when the loop has been stuck for
+# longer than BLOCK_THRESHOLD it grabs the loop thread's current stack, tags it with the team module and
+# function responsible, and adds it to a rolling JSON report once the loop recovers. The cost is one tiny
+# task wake-up and one thread wake-up every HEARTBEAT_INTERVAL.
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_INTERVAL = 0.1  # seconds between heartbeats and watchdog checks
+BLOCK_THRESHOLD = 0.25  # seconds the loop may be stuck before its stack is captured
+REPORT_SIZE = 50  # blocking incidents kept in the report
+STACK_DEPTH = 15  # innermost frames kept per incident
+REPORT_PATH = os.getenv("LOOP_REPORT_PATH", "loop_report.json")
+
+TEAM_MODULES = {"LAFC", "Anaheim_Ducks", "LA_Angels", "LA_Clippers"}
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+stats = {
+    "last_lag": 0.0,  # seconds, latest heartbeat
+    "max_lag": 0.0,  # seconds, since startup
+    "blocks": 0,  # incidents longer than BLOCK_THRESHOLD
+}
+blocks_by_module = defaultdict(int)
+incidents = deque(maxlen=REPORT_SIZE)
+
+_last_beat = None  # time.monotonic() of the latest heartbeat
+_loop_thread_id = None
+_heartbeat_task = None
+_watchdog = None
+_stop = threading.Event()
+
+
+async def _heartbeat():
+    global _last_beat
+    while True:
+        _last_beat = time.monotonic()
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        lag = max(0.0, time.monotonic() - _last_beat - HEARTBEAT_INTERVAL)
+        stats["last_lag"] = lag
+        stats["max_lag"] = max(stats["max_lag"], lag)
+
+
+def _module_name(frame):
+    return os.path.splitext(os.path.basename(frame.filename))[0]
+
+
+def _is_repo_frame(frame):
+    return frame.filename.startswith(REPO_DIR) and "site-packages" not in frame.filename
+
+
+# describes what the loop thread is doing, blaming the innermost team module frame when there is one
+def _describe(frame):
+    stack = traceback.extract_stack(frame)
+    culprit = next((f for f in reversed(stack) if _is_repo_frame(f) and _module_name(f) in TEAM_MODULES), None)
+    if culprit is None:
+        culprit = next((f for f in reversed(stack) if _is_repo_frame(f)), stack[-1])
+    return {
+        "at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "module": _module_name(culprit),
+        "function": culprit.name,
+        "line": culprit.lineno,
+        "team_module": _module_name(culprit) in TEAM_MODULES,
+        "stack": [line.rstrip() for line in traceback.format_list(stack[-STACK_DEPTH:])],
+    }
+
+
+def _write_report():
+    try:
+        json_files.write_atomic(REPORT_PATH, {"threshold": BLOCK_THRESHOLD, "stats": stats,
+                                              "blocks_by_module": blocks_by_module, "incidents": list(incidents)},
+                                indent=2)
+    except OSError as e:
+        logger.error(f"Error writing {REPORT_PATH}: {e}")
+
+
+def _watch():
+    pending = None  # incident captured while the loop is still blocked
+    blocked_beat = None
+    while not _stop.wait(HEARTBEAT_INTERVAL):
+        beat = _last_beat
+        if beat is None:
+            continue
+
+        if time.monotonic() - beat - HEARTBEAT_INTERVAL > BLOCK_THRESHOLD:
+            if pending is None:
+                frame = sys._current_frames().get(_loop_thread_id)
+                if frame is not None:
+                    pending, blocked_beat = _describe(frame), beat
+                del frame
+            continue
+
+        # the loop is running again: the next heartbeat measured how long it was stuck
+        if pending is not None and beat != blocked_beat:
+            pending["duration"] = round(max(stats["last_lag"], beat - blocked_beat - HEARTBEAT_INTERVAL), 3)
+            incidents.append(pending)
+            stats["blocks"] += 1
+            blocks_by_module[pending["module"]] += 1
+            logger.warning(f"Event loop blocked for {pending['duration']:.2f}s in {pending['module']}."
+                           f"{pending['function']} (line {pending['line']})")
+            _write_report()
+            pending = None
+
+
+# starts the heartbeat on the running loop and the watchdog thread, safe to call more than once
+def start():
+    global _heartbeat_task, _watchdog, _loop_thread_id
+    if _heartbeat_task is None or _heartbeat_task.done():
+        _loop_thread_id = threading.get_ident()
+        _heartbeat_task = asyncio.get_running_loop().create_task(_heartbeat())
+    if _watchdog is None or not _watchdog.is_alive():
+        _stop.clear()
+        _watchdog = threading.Thread(target=_watch, name="loop-watchdog", daemon=True)
+        _watchdog.start()
+
+
+def stop():
+    _stop.set()
+    if _heartbeat_task is not None:
+        _heartbeat_task.cancel()
@@ -1,5 +1,6 @@
 import asyncio
 import datetime
+import time
 import pytz
 import os
 import logging
@@ -12,8 +13,18 @@ import Anaheim_Ducks
 import LAFC
 import LA_Angels
 import LA_Clippers
+import http_cache
+import http_session
+import loop_monitor
+import metrics
+import outbox
+import polling
+import singleflight
+import state_store
+import subscriptions
+import tracing
 import webserver
-from responses import get_response
+from responses import get_response, start_next_chance_refresher
 
 # Define the timezone (Pacific Time Zone)
 pacific_tz = pytz.timezone("America/Los_Angeles")
@@ -22,264 +33,402 @@ pacific_tz = pytz.timezone("America/Los_Angeles")
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
-notifications_sent = {
-    "LAFC": False,
-    "Ducks": False,
-    "Clippers": False,
-    "Angels": False
-}
-
 # STEP 0: LOAD OUR TOKEN FROM SOMEWHERE SAFE AND CREATE OUR GAME VARIABLES
 load_dotenv()
 TOKEN: Final[str] = os.getenv('DISCORD_TOKEN')
 MLB_API_URL: Final[str] = "https://statsapi.mlb.com/api/v1/schedule?sportId=1"
 NHL_API_URL: Final[str] = "https://api-web.nhle.com/v1/score/now"
-LAFC_API_URL: Final[str] = "https://api.football-data.org/v4/teams/740/matches?status=FINISHED"
-
-LAFC_game = False
-LA_Clippers_game = False
-ANA_Ducks_game = False
-LA_Angels_game = False
-clippers_game_id = None
-clippers_result = None
-current_date = datetime.datetime.now(pacific_tz).date() - datetime.timedelta(days=1)
 
-# Lock for shared state
-state_lock = asyncio.Lock()
 
 # STEP 1: BOT SETUP
+class ChickBotClient(Client):
+    # start the health and metrics server and the blocking-call detector before connecting to Discord
+    async def setup_hook(self) -> None:
+        await webserver.start()
+        loop_monitor.start()
+
+    # release the shared HTTP connection pool and the web server when the bot shuts down
+    async def close(self) -> None:
+        await http_session.close_session()
+        await webserver.stop()
+        loop_monitor.stop()
+        tracing.stop()
+        await super().close()
+
+
 intents: Intents = Intents.default()
 intents.message_content = True  # NOQA
-client: Client = Client(intents=intents)
+client: Client = ChickBotClient(intents=intents)
 CHANNEL_ID: Final[int] = int(os.getenv('DISCORD_CHANNEL_ID'))
+http_session.trace_configs.append(metrics.trace_config())  # Upstream request metrics for /metrics
 
 
 # STEP 2: CHECK FOR GAMES TODAY
-async def check_for_games():
-    global LAFC_game, ANA_Ducks_game, LA_Angels_game, LA_Clippers_game, clippers_game_id, clippers_result
-    async with state_lock:
-        try:
-            logger.debug("Checking for LAFC game")
-            LAFC_game = await LAFC.game_today()
-            logger.debug(LAFC_game)
-        except Exception as e:
-            logger.error(f"Error checking LAFC game: {e}")
-            LAFC_game = False
+# Each team gets its own deadline so a slow source (fbref, stats.nba.com) only costs that team's result
+DISCOVERY_TIMEOUTS: Final[dict] = {
+    "LAFC": 20,
+    "Ducks": 10,
+    "Angels": 10,
+    "Clippers": 20
+}
 
-        try:
-            logger.debug("Checking for Ducks game")
-            ANA_Ducks_game = await Anaheim_Ducks.ducks_home_game_today()  # Await the asynchronous function
-            logger.debug(ANA_Ducks_game)
-        except Exception as e:
-            logger.error(f"Error checking Ducks game: {e}")
-            ANA_Ducks_game = False
+# Lookup that tells whether each team has a home game today (the Clippers lookup returns today's game ID)
+TEAM_LOOKUPS: Final[dict] = {
+    "LAFC": LAFC.game_today,
+    "Ducks": Anaheim_Ducks.ducks_home_game_today,
+    "Angels": LA_Angels.get_today_angels_home_game,
+    "Clippers": LA_Clippers.get_game_id_today
+}
+
+# Season schedule index per team, used to look up today's scheduled start time
+TEAM_SCHEDULES: Final[dict] = {
+    "LAFC": LAFC.season_schedule,
+    "Ducks": Anaheim_Ducks.season_schedule,
+    "Angels": LA_Angels.season_schedule,
+    "Clippers": LA_Clippers.season_schedule
+}
 
-        try:
-            logger.debug("Checking for Angels game")
-            LA_Angels_game = await LA_Angels.get_today_angels_home_game()  # Await the asynchronous function
-            logger.debug(LA_Angels_game)
-        except Exception as e:
-            logger.error(f"Error checking Angels game: {e}")
-            LA_Angels_game = False
 
+# Everything one team's poller knows about today's game. Each state is only read and written by its own
+# team's poller task, so no lock is needed.
+class TeamState:
+    def __init__(self, team):
+        self.team = team
+        self.day = None  # date the state was discovered for, None forces a new discovery
+        self.has_game = False
+        self.game_id = None  # Clippers game ID, Angels gamePk
+        self.start = None  # scheduled start of today's game, None when unknown
+        self.next_poll_at = None
+        self.finished = False  # the result has been announced
+        self.win_announced = False  # the sandwich has been announced, possibly before the game ended
+
+    def snapshot(self):
+        return {
+            "day": self.day.isoformat(),
+            "has_game": self.has_game,
+            "game_id": self.game_id,
+            "start": self.start.isoformat() if self.start else None,
+            "next_poll_at": self.next_poll_at.isoformat() if self.next_poll_at else None,
+            "finished": self.finished,
+            "win_announced": self.win_announced,
+        }
+
+    def restore(self, snapshot):
+        self.day = datetime.date.fromisoformat(snapshot["day"])
+        self.has_game = snapshot["has_game"]
+        self.game_id = snapshot["game_id"]
+        self.start = parse_pacific(snapshot["start"])
+        self.next_poll_at = parse_pacific(snapshot["next_poll_at"])
+        self.finished = snapshot["finished"]
+        self.win_announced = snapshot.get("win_announced", self.finished)
+
+
+def parse_pacific(text):
+    return datetime.datetime.fromisoformat(text).astimezone(pacific_tz) if text else None
+
+
+team_states = {team: TeamState(team) for team in TEAM_LOOKUPS}
+
+
+# saves every discovered team state, called after each transition: today's game was discovered and announced,
+# or its result was announced. The messages are only queued by then, so a crash right after loses at most
+# those messages and never posts them twice.
+def checkpoint():
+    state_store.save({team: state.snapshot() for team, state in team_states.items() if state.day is not None})
+
+
+# picks up today's saved state for teams that have not been discovered yet, so their pollers skip discovery
+# and the announcements already made. Called before the pollers start, since it replaces their states.
+def restore_team_states():
+    today = datetime.datetime.now(pacific_tz).date()
+    for team, snapshot in state_store.load().items():
+        if team not in team_states or team_states[team].day is not None or snapshot.get("day") != today.isoformat():
+            continue
+        state = TeamState(team)
         try:
-            logger.debug("Checking for Clippers game")
-            clippers_game_id = await LA_Clippers.get_game_id_today()  # Await the asynchronous function
-            logger.debug(clippers_game_id)
-            if clippers_game_id:
-                LA_Clippers_game = clippers_game_id is not None
-                logger.debug(LA_Clippers_game)
-            else:
-                LA_Clippers_game = False
-        except Exception as e:
-            logger.error(f"Error checking Clippers game: {e}")
-            LA_Clippers_game = False
+            state.restore(snapshot)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.error(f"Ignoring the saved {team} state: {e}")
+            continue
+        team_states[team] = state
+        logger.info(f"Resuming the {team} poller from the saved state (game today: {state.has_game}, "
+                    f"finished: {state.finished})")
+
+
+# runs a single team lookup under its deadline, returning False when it fails or times out
+async def timed_lookup(team, lookup):
+    started = time.perf_counter()
+    try:
+        logger.debug(f"Checking for {team} game")
+        result = await asyncio.wait_for(lookup(), timeout=DISCOVERY_TIMEOUTS[team])
+    except asyncio.TimeoutError:
+        logger.error(f"Timed out checking {team} game after {DISCOVERY_TIMEOUTS[team]}s")
+        result = False
+    except Exception as e:
+        logger.error(f"Error checking {team} game: {e}")
+        result = False
+    logger.debug(f"{team} lookup finished in {time.perf_counter() - started:.2f}s: {result}")
+    return result
+
+
+# returns the scheduled start of today's home game for the team, or None if it is unknown
+async def todays_start(team):
+    try:
+        game = await asyncio.wait_for(TEAM_SCHEDULES[team].game_on(), timeout=DISCOVERY_TIMEOUTS[team])
+    except Exception as e:
+        logger.error(f"Error looking up the {team} start time: {e}")
+        return None
+    return game.start if game else None
+
+
+# looks up whether the team plays at home on the given day and plans its first poll
+async def discover(state, day):
+    team = state.team
+    result = await timed_lookup(team, TEAM_LOOKUPS[team])
+    start = await todays_start(team) if result else None
+
+    # Publish everything at once, after the network calls
+    now = datetime.datetime.now(pacific_tz)
+    state.day = day
+    state.has_game = bool(result)
+    state.game_id = result if team == "Clippers" and result else None
+    state.start = start
+    state.finished = False
+    state.win_announced = False
+    # first check just before the start, or right away when the game is already underway
+    state.next_poll_at = max(now, start - polling.PRE_GAME_LEAD) if start is not None else now
+    if state.has_game:
+        polling.log_plan(team, start, now)
+
+
+# STEP 3: DELIVERING ALERTS
+# returns the channels subscribed to the team's alerts
+def subscribed_channels(team):
+    channels = []
+    for channel_id in subscriptions.channels_for(team):
+        channel = client.get_channel(channel_id)
+        if channel is None:
+            logger.warning(f"Subscribed channel {channel_id} is not visible to the bot")
+            continue
+        channels.append(channel)
+    return channels
+
+
+# queues a message about the team's game for every subscribed channel
+def announce(team, content, priority=outbox.PRIORITY_NORMAL, delete_after=None):
+    for channel in subscribed_channels(team):
+        outbox.post(channel, content, priority=priority, delete_after=delete_after)
+
+
+CLAIM_LINK: Final[str] = "[here](https://apps.apple.com/us/app/chick-fil-a/id488818252)"
+
+# Messages posted for each team: the morning announcement, the end of the game, and the outcome
+TEAM_MESSAGES: Final[dict] = {
+    "LAFC": {
+        "today": "LAFC has a home game today! Be on the lookout for a free sandwich :chicken::sandwich:",
+        "finished": "The LAFC Game has finished!",
+        "won": f"@everyone LAFC has won their home game! Free Chick-fil-A sandwich! Open {CLAIM_LINK} to claim "
+               f"your sandwich!",
+        "lost": "LAFC did not win... no free sandwich today...",
+    },
+    "Ducks": {
+        "today": "The Anaheim Ducks has a home game today! Be on the lookout for a free sandwich "
+                 ":chicken::sandwich:",
+        "finished": "The Ducks Game has finished!",
+        "won": f"@everyone The Anaheim Ducks have scored 5 or more goals at a home game! Free Chick-fil-A "
+               f"sandwich! Open {CLAIM_LINK} to claim your sandwich!",
+        "lost": "The Anaheim Ducks did not score 5 points... no free sandwich today...",
+    },
+    "Clippers": {
+        "today": "The LA Clippers has a home game today! Be on the lookout for a free sandwich "
+                 ":chicken::sandwich:",
+        "finished": "The Clippers Game has finished!",
+        "won": f"@everyone The opponents of the Los Angeles Clippers missed 2 free throw at a home game! Free "
+               f"Chick-fil-A sandwich! Open {CLAIM_LINK} to claim your sandwich!",
+        "lost": "The Clippers opponents did miss 2 free throws in the 4th quarter... no free sandwich today...",
+    },
+    "Angels": {
+        "today": "The Los Angeles Angels has a home game today! Be on the lookout for a free sandwich "
+                 ":chicken::sandwich:",
+        "finished": "The Angels Game has finished!",
+        "won": f"@everyone The Los Angeles Angels have scored 7 points! Free Chick-fil-A sandwich! Open "
+               f"{CLAIM_LINK} to claim your sandwich!",
+        "lost": "The Angels did not score 7 points... no free sandwich today...",
+    },
+}
+
+
+# announces the free sandwich for the team's game, once, as soon as the condition is met
+def announce_win(state):
+    if state.win_announced:
+        return
+    state.win_announced = True
+    now = datetime.datetime.now(pacific_tz)
+    announce(state.team, TEAM_MESSAGES[state.team]["won"], priority=outbox.PRIORITY_PROMO,
+             delete_after=seconds_until_midnight(now))
+    checkpoint()
+
+
+# STEP 4: CHECKING EACH TEAM'S GAME
+# Each check returns None while the game is still going, otherwise whether the sandwich condition was met
+async def check_lafc(state):
+    lafc_results = await LAFC.get_match_results()
+    if lafc_results not in ("Win", "Lose", "Draw"):
+        return None
+    return lafc_results == "Win"
+
+
+async def check_ducks(state):
+    # find the game ID for today
+    today_ducks_game = await Anaheim_Ducks.get_game_id()
+    ducks_results = await Anaheim_Ducks.check_ducks_score(today_ducks_game)
+    if ducks_results == "The game hasn't finished yet!":
+        return None
+    return bool(ducks_results)
 
 
-# STEP 4: PERIODIC CHECK FUNCTION
-async def periodic_check():
-    global LAFC_game, ANA_Ducks_game, LA_Angels_game, LA_Clippers_game, clippers_game_id, clippers_result, current_date
+async def check_clippers(state):
+    if not await LA_Clippers.check_game_finish_v2(state.game_id):
+        return None
+    # changed this so that it checks if the opponent made one basket or not
+    return bool(await LA_Clippers.check_missed_ft_in_4th_quarter_v2(state.game_id))
+
+
+# follows the live feed, so the 7th run is announced the moment it is scored instead of after the final out
+async def check_angels(state):
     try:
-        await client.wait_until_ready()  # Wait until the bot is ready
-        channel = client.get_channel(CHANNEL_ID)  # Get the channel to send messages
+        if state.game_id is None:
+            state.game_id = await LA_Angels.get_game_id()
+        tracker = await LA_Angels.poll_live_game(state.game_id)
+    except Exception as e:
+        logger.error(f"Error reading the Angels live feed, checking the schedule instead: {e}")
+        angels_result = await LA_Angels.check_angels_score()
+        if angels_result == "The game has not finished yet!":
+            return None
+        return bool(angels_result)
+
+    if tracker.runs >= LA_Angels.SANDWICH_RUNS:
+        logger.info(f"The Angels have scored {tracker.runs} runs.")
+        announce_win(state)
+    if not tracker.final:
+        return None
+    return tracker.runs >= LA_Angels.SANDWICH_RUNS
+
+
+TEAM_CHECKS: Final[dict] = {
+    "LAFC": check_lafc,
+    "Ducks": check_ducks,
+    "Clippers": check_clippers,
+    "Angels": check_angels
+}
 
-        while not client.is_closed():
-            ongoing_games = False
 
-            # calculate the amount of time left before the day ends
+# returns the number of seconds until midnight, when today's messages are deleted and new games are found
+def seconds_until_midnight(now):
+    tomorrow = now.replace(hour=0, minute=0, second=0, microsecond=0) + datetime.timedelta(days=1)
+    return (tomorrow - now).seconds
+
+
+# logs the shared cache, request coalescing and outbox counters
+def log_stats():
+    logger.debug(f"HTTP cache: {http_cache.get_stats()}")
+    # every team's poller logs these, so the counts are totals since startup rather than per poll
+    if singleflight.stats["calls"]:
+        logger.debug(f"Single-flight: {singleflight.stats['coalesced']} of {singleflight.stats['calls']} "
+                     f"scoreboard fetches since startup were duplicates answered without another request")
+    logger.debug(f"Outbox: {outbox.get_stats()}")
+
+
+# runs one poll of the team's game and returns how many seconds to wait before the next one
+async def poll_once(state):
+    team = state.team
+    now = datetime.datetime.now(pacific_tz)
+
+    # a new day: find out whether there is a game and announce it
+    if state.day != now.date():
+        logger.info(f"Checking for a {team} game today.")
+        with tracing.span("discover", team=team):
+            await discover(state, now.date())
+        now = datetime.datetime.now(pacific_tz)  # Discovery scheduled the first poll relative to this
+        if state.has_game:
+            announce(team, TEAM_MESSAGES[team]["today"], delete_after=seconds_until_midnight(now))
+        checkpoint()
+
+    if state.has_game and not state.finished:
+        if now >= state.next_poll_at:
+            state.next_poll_at = now + datetime.timedelta(seconds=polling.next_poll_delay(team, state.start, now))
+            logger.info(f"There is a {team} game today!")
+            with tracing.span("check", team=team):
+                result = await TEAM_CHECKS[team](state)
             now = datetime.datetime.now(pacific_tz)
-            tomorrow = now.replace(hour=0, minute=0, second=0, microsecond=0) + datetime.timedelta(days=1)
-            seconds_left = (tomorrow - now).seconds
-
-            # retrieve today's date to compare to current date
-            today_date = now.date()
-            print(today_date)
-            print(current_date)
-            date_change = False
-
-            if today_date > current_date:
-                logger.info("Starting periodic check for games.")
-                await check_for_games()  # Refresh the state of game variables
-                date_change = True
-
-            async with state_lock:
-                if LAFC_game:
-                    if today_date > current_date:
-                        date_change = True
-                        await channel.send("LAFC has a home game today! Be on the lookout for a free sandwich "
-                                           ":chicken::sandwich:", delete_after=seconds_left)
-                    logger.info("there is an lafc game today!")
-                    lafc_results = await LAFC.get_match_results()
-                    if lafc_results == "Win" or lafc_results == "Lose" or lafc_results == "Draw":
-                        if not notifications_sent["LAFC"]:
-                            notifications_sent["LAFC"] = True
-                            logger.info("The game has finished!")
-                            await channel.send("The LAFC Game has finished!", delete_after=seconds_left)
-                            if lafc_results['outcome'] == "Win":
-                                logger.info("Conditions are met for LAFC game.")
-                                await channel.send(
-                                    "@everyone LAFC has won their home game! Free Chick-fil-A sandwich! Open "
-                                    "[here](https://apps.apple.com/us/app/chick-fil-a/id488818252) to claim your sandwich!",
-                                    delete_after=seconds_left
-                                )
-                            else:
-                                logger.info("Conditions are met for LAFC games.")
-                                await channel.send(
-                                    "LAFC did not win... no free sandwich today...",
-                                    delete_after=seconds_left
-                                )
-                        # Game is over, reset the state
-                        LAFC_game = False
-
-                    else:
-                        logger.info("The LAFC game hasn't finished yet.")
-                        ongoing_games = True  # Game is still ongoing, continue checking
-
-                if ANA_Ducks_game:
-                    if today_date > current_date:
-                        date_change = True
-                        await channel.send("The Anaheim Ducks has a home game today! Be on the lookout for a free sandwich "
-                                           ":chicken::sandwich:", delete_after=seconds_left)
-                    logger.info("There is a ducks game today!")
-                    # find the game ID for today
-                    today_ducks_game = await Anaheim_Ducks.get_game_id()
-                    ducks_results = await Anaheim_Ducks.check_ducks_score(today_ducks_game)
-                    if ducks_results != "The game hasn't finished yet!":
-                        if not notifications_sent["Ducks"]:
-                            notifications_sent["Ducks"] = True
-                            logger.info("The game has finished!")
-                            await channel.send("The Ducks Game has finished!", delete_after=seconds_left)
-                            if ducks_results:
-                                logger.info("Conditions are met for Ducks games.")
-                                await channel.send(
-                                    "@everyone The Anaheim Ducks have scored 5 or more goals at a home game! Free Chick-fil-A "
-                                    "sandwich! Open [here](https://apps.apple.com/us/app/chick-fil-a/id488818252) to claim your"
-                                    "sandwich!",
-                                    delete_after=seconds_left
-                                )
-                            else:
-                                logger.info("Conditions are not met for Ducks game.")
-                                await channel.send(
-                                    "The Anaheim Ducks did not score 5 points... no free sandwich today...",
-                                    delete_after=seconds_left
-                                )
-                        # Game is over, reset the state
-                        ANA_Ducks_game = False
-
-                    else:
-                        logger.info("The Ducks game hasn't finished yet.")
-                        ongoing_games = True  # Game is still ongoing, continue checking
-
-                if LA_Clippers_game:
-                    if today_date > current_date:
-                        date_change = True
-                        await channel.send("The LA Clippers has a home game today! Be on the lookout for a free sandwich "
-                                           ":chicken::sandwich:", delete_after=seconds_left)
-                    logger.info("There is a clippers game today!")
-                    clippers_result = await LA_Clippers.check_game_finish_v2(clippers_game_id)
-                    if clippers_result:
-                        if not notifications_sent["Clippers"]:
-                            notifications_sent["Clippers"] = True
-                            logger.info("The clipper game has finished!")
-                            await channel.send("The Clippers Game has finished!", delete_after=seconds_left)
-                            clippers_4th_quarter = await LA_Clippers.check_missed_ft_in_4th_quarter_v2(clippers_game_id)
-                            if clippers_4th_quarter:
-                                logger.info("Conditions are met for Clippers game.")
-                                # changed this so that it checks if the opponent made one basket or not
-                                await channel.send(
-                                    "@everyone The opponents of the Los Angeles Clippers missed 2 free throw at a home game! "
-                                    "Free Chick-fil-A sandwich! Open [here]("
-                                    "https://apps.apple.com/us/app/chick-fil-a/id488818252) to claim your sandwich!",
-                                    delete_after=seconds_left
-                                )
-                            else:
-                                logger.info("Conditions are not met for clippers game.")
-                                await channel.send(
-                                    "The Clippers opponents did miss 2 free throws in the 4th quarter... no free sandwich "
-                                    "today...",
-                                    delete_after=seconds_left
-                                )
-                        # Game is over, reset the state
-                        LA_Clippers_game = False
-
-                    else:
-                        logger.info("The Clippers game hasn't finished yet.")
-                        ongoing_games = True  # Game is still ongoing, continue checking
-
-                if LA_Angels_game:
-                    if today_date > current_date:
-                        date_change = True
-                        await channel.send("The Los Angeles Clippers has a home game today! Be on the lookout for a free "
-                                           "sandwich :chicken::sandwich:", delete_after=seconds_left)
-                    logger.info("There is an Angels game today!")
-                    angels_result = await LA_Angels.check_angels_score()
-                    if angels_result != "The game has not finished yet!":
-                        if not notifications_sent["Angels"]:
-                            notifications_sent["Angels"] = True
-                            logger.info("The Angels game has finished!")
-                            await channel.send("The Angels Game has finished!", delete_after=seconds_left)
-                            if angels_result:
-                                logger.info("Conditions are met for Angels game.")
-                                await channel.send(
-                                    "@everyone The Los Angeles Angels have scored 7 points! Free Chick-fil-A sandwich! Open ["
-                                    "here](https://apps.apple.com/us/app/chick-fil-a/id488818252) to claim your sandwich!",
-                                    delete_after=seconds_left
-                                )
-                            else:
-                                logger.info("Conditions are not met for Angels game.")
-                                await channel.send(
-                                    "The Angels did not score 7 points... no free sandwich today...",
-                                    delete_after=seconds_left
-                                )
-                        # Game is over, reset the state
-                        LA_Angels_game = False
-                    else:
-                        logger.info("The Angels game hasn't finished yet.")
-                        ongoing_games = True
-                if date_change and ongoing_games is False:
-                    current_date = today_date
-                    notifications_sent["LAFC"] = False
-                    notifications_sent["Ducks"] = False
-                    notifications_sent["Clippers"] = False
-                    notifications_sent["Angels"] = False
-                elif date_change:
-                    current_date = today_date
-
-                if not LAFC_game and not ANA_Ducks_game and not LA_Clippers_game and not LA_Angels_game:
-                    ongoing_games = False
-
-            # If there are still ongoing games, wait for 10 minutes before checking again
-            if ongoing_games:
-                logger.info("There is still an ongoing game today! This will check every 5 minutes")
-                await asyncio.sleep(300)  # Wait for 5 minutes before checking again
+            if result is None:
+                logger.info(f"The {team} game hasn't finished yet.")
             else:
-                logger.info("There are no ongoing games today or the games have finished. Wait 3 hours for the next check.")
-                await asyncio.sleep(600)  # Wait for 10 minutes before checking for new games
-    except Exception as e:
-        logger.critical(f"Fatal error in periodic_check: {e}", exc_info=True)
+                state.finished = True
+                logger.info(f"The {team} game has finished! Conditions are {'' if result else 'not '}met.")
+                seconds_left = seconds_until_midnight(now)
+                announce(team, TEAM_MESSAGES[team]["finished"], delete_after=seconds_left)
+                if result:
+                    announce_win(state)
+                else:
+                    announce(team, TEAM_MESSAGES[team]["lost"], delete_after=seconds_left)
+                checkpoint()
+            log_stats()
+
+        # still going: sleep until the adaptive schedule says to look again
+        if not state.finished:
+            delay = max(1.0, (state.next_poll_at - now).total_seconds())
+            logger.info(f"The {team} game is still ongoing! Checking again in {delay:.0f} seconds")
+            return delay
+
+    # no game or the game has finished: wake up just after midnight to check for a new game
+    return seconds_until_midnight(now) + 5
+
+
+# STEP 5: PER-TEAM POLLER TASKS
+# Each team runs in its own task, so a slow scrape for one team never delays another team's result, and a
+# crash restarts only that team's poller after a growing delay
+RESTART_MIN_DELAY = 1
+RESTART_MAX_DELAY = 300
+poller_tasks = {}
+
+
+async def team_poller(state):
+    while not client.is_closed():
+        with tracing.span("poll", team=state.team):
+            delay = await poll_once(state)
+        metrics.record_poll(state.team)
+        await asyncio.sleep(delay)
+
+
+async def supervise(team):
+    await client.wait_until_ready()  # Wait until the bot is ready
+    delay = RESTART_MIN_DELAY
+    while not client.is_closed():
+        started = time.monotonic()
+        try:
+            await team_poller(team_states[team])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.critical(f"{team} poller crashed, restarting in {delay}s: {e}", exc_info=True)
+
+        # a poller that ran for a while before crashing starts over from the shortest delay
+        if time.monotonic() - started > RESTART_MAX_DELAY:
+            delay = RESTART_MIN_DELAY
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, RESTART_MAX_DELAY)
+
+
+# starts a supervised poller per team, safe to call again after a reconnect
+def start_pollers():
+    for team in team_states:
+        task = poller_tasks.get(team)
+        if task is None or task.done():
+            poller_tasks[team] = asyncio.get_running_loop().create_task(supervise(team), name=f"poller-{team}")
 
 
-# STEP 5: MESSAGE FUNCTIONALITY
+# STEP 6: MESSAGE FUNCTIONALITY
 async def send_message(message: Message, user_message: str) -> None:
     if not user_message:
         logger.info('(Message was empty because intents were not enabled probably)')
@@ -298,14 +447,19 @@ async def send_message(message: Message, user_message: str) -> None:
         logger.info(e)
 
 
-# STEP 6: HANDLING THE STARTUP FOR OUR BOT
+# STEP 7: HANDLING THE STARTUP FOR OUR BOT
 @client.event
 async def on_ready() -> None:
     logger.info(f'{client.user} is now running!')
-    await client.loop.create_task(periodic_check())  # Start the periodic check loop
+    await http_session.open_session()  # Share one pooled HTTP client across all team modules
+    start_next_chance_refresher()  # Keep the "next chance" reply precomputed
+    subscriptions.ensure_default(CHANNEL_ID)  # The configured channel gets every team's alerts until changed
+    if not poller_tasks:
+        restore_team_states()  # After a restart, carry on with today's games without announcing them again
+    start_pollers()  # Start one poller task per team
 
 
-# STEP 7: HANDLING INCOMING MESSAGES
+# STEP 8: HANDLING INCOMING MESSAGES
 @client.event
 async def on_message(message: Message) -> None:
     # Ignore messages from the bot itself
@@ -327,15 +481,16 @@ async def on_message(message: Message) -> None:
         cleaned_message = user_message.replace(bot_mention, "").strip()
 
         # Generate a response and send it
-        response = await get_response(cleaned_message, bot_mention)
+        can_manage = message.guild is None or message.channel.permissions_for(message.author).manage_channels
+        response = await get_response(cleaned_message, bot_mention, channel_id=message.channel.id,
+                                      guild_id=message.guild.id if message.guild else None, can_manage=can_manage)
         await message.channel.send(response, delete_after=4320)
         return
 
 
-# STEP 8: MAIN ENTRY POINT
+# STEP 9: MAIN ENTRY POINT
 def main() -> None:
     try:
-        webserver.keep_alive()
         client.run(TOKEN)
     except Exception as e:
         logger.critical(f"Critical error occurred: {e}", exc_info=True)
@@ -0,0 +1,135 @@
+import logging
+import time
+from collections import defaultdict
+
+import aiohttp
+
+import http_cache
+import loop_monitor
+import outbox
+import singleflight
+
+# Counters behind the /metrics endpoint, rendered in the Prometheus text format. Upstream requests are
+# measured with an aiohttp TraceConfig on the shared session, so every team module is covered without
+# touching its code (nba_api calls go through requests and are not included).
+
+logger = logging.getLogger(__name__)
+
+# upper bounds in seconds of the upstream latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+upstream_requests = defaultdict(int)  # (host, status) -> requests
+upstream_bytes = defaultdict(int)  # host -> response body bytes received
+upstream_latency = {}  # host -> requests per latency bucket, the last entry counting those above every bound
+upstream_latency_sum = defaultdict(float)
+upstream_latency_count = defaultdict(int)
+last_successful_poll = {}  # team -> unix time of its last poll that completed without an error
+
+
+# records one upstream request that finished with the status ("error" when it raised)
+def observe_request(host, status, seconds):
+    upstream_requests[(host, str(status))] += 1
+    buckets = upstream_latency.setdefault(host, [0] * (len(LATENCY_BUCKETS) + 1))
+    for index, bound in enumerate(LATENCY_BUCKETS):
+        if seconds <= bound:
+            buckets[index] += 1
+            break
+    else:
+        buckets[-1] += 1
+    upstream_latency_sum[host] += seconds
+    upstream_latency_count[host] += 1
+
+
+def record_poll(team):
+    last_successful_poll[team] = time.time()
+
+
+# returns a TraceConfig that feeds the upstream metrics, registered in http_session.trace_configs by main
+def trace_config():
+    config = aiohttp.TraceConfig()
+
+    async def on_request_start(session, context, params):
+        context.host = params.url.host
+        context.started = time.perf_counter()
+
+    # timed until the response headers arrive, the body is counted as it is read
+    async def on_request_end(session, context, params):
+        observe_request(context.host, params.response.status, time.perf_counter() - context.started)
+
+    async def on_request_exception(session, context, params):
+        observe_request(context.host, "error", time.perf_counter() - context.started)
+
+    async def on_response_chunk_received(session, context, params):
+        upstream_bytes[context.host] += len(params.chunk)
+
+    config.on_request_start.append(on_request_start)
+    config.on_request_end.append(on_request_end)
+    config.on_request_exception.append(on_request_exception)
+    config.on_response_chunk_received.append(on_response_chunk_received)
+    return config
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels.items()) + "}"
+
+
+def _metric(lines, name, kind, help_text, samples):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+    for labels, value in samples:
+        lines.append(f"{name}{labels} {value}")
+
+
+# returns every metric in the Prometheus text exposition format
+def render():
+    lines = []
+    _metric(lines, "chickbot_upstream_requests_total", "counter", "Upstream HTTP requests by host and status.",
+            [(_labels(host=host, status=status), count)
+             for (host, status), count in sorted(upstream_requests.items())])
+
+    lines.append("# HELP chickbot_upstream_request_duration_seconds Time until the upstream response headers "
+                 "arrived.")
+    lines.append("# TYPE chickbot_upstream_request_duration_seconds histogram")
+    for host, buckets in sorted(upstream_latency.items()):
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, buckets):
+            cumulative += count
+            lines.append(f"chickbot_upstream_request_duration_seconds_bucket{_labels(host=host, le=bound)} "
+                         f"{cumulative}")
+        lines.append(f"chickbot_upstream_request_duration_seconds_bucket{_labels(host=host, le='+Inf')} "
+                     f"{upstream_latency_count[host]}")
+        lines.append(f"chickbot_upstream_request_duration_seconds_sum{_labels(host=host)} "
+                     f"{upstream_latency_sum[host]:.6f}")
+        lines.append(f"chickbot_upstream_request_duration_seconds_count{_labels(host=host)} "
+                     f"{upstream_latency_count[host]}")
+
+    _metric(lines, "chickbot_upstream_response_bytes_total", "counter", "Upstream response body bytes received.",
+            [(_labels(host=host), count) for host, count in sorted(upstream_bytes.items())])
+
+    cache = http_cache.get_stats()
+    _metric(lines, "chickbot_http_cache_requests_total", "counter", "HTTP cache lookups by result.",
+            [(_labels(result=name), cache[name]) for name in http_cache.stats])
+    _metric(lines, "chickbot_http_cache_hit_ratio", "gauge",
+            "Share of HTTP cache lookups answered without a full download.", [("", f"{cache['hit_rate']:.4f}")])
+    _metric(lines, "chickbot_singleflight_calls_total", "counter", "Coalesced scoreboard fetches by result.",
+            [(_labels(result=name), count) for name, count in singleflight.stats.items()])
+
+    sent = outbox.get_stats()
+    _metric(lines, "chickbot_outbox_messages_total", "counter", "Outbound Discord messages by result.",
+            [(_labels(result=name), sent[name]) for name in outbox.stats])
+    _metric(lines, "chickbot_outbox_queue_depth", "gauge", "Messages waiting to be sent.", [("", sent["depth"])])
+    _metric(lines, "chickbot_outbox_send_latency_seconds", "summary", "Time from queueing to sending a message.",
+            [(_labels(quantile="0.5"), f"{sent['latency_p50']:.6f}"),
+             (_labels(quantile="0.95"), f"{sent['latency_p95']:.6f}")])
+
+    _metric(lines, "chickbot_last_successful_poll_timestamp_seconds", "gauge",
+            "Unix time of each team's last poll that completed without an error.",
+            [(_labels(team=team), f"{at:.0f}") for team, at in sorted(last_successful_poll.items())])
+    _metric(lines, "chickbot_event_loop_lag_seconds", "gauge", "Latest event-loop lag sample.",
+            [("", f"{loop_monitor.stats['last_lag']:.6f}")])
+    _metric(lines, "chickbot_event_loop_lag_max_seconds", "gauge", "Largest event-loop lag since startup.",
+            [("", f"{loop_monitor.stats['max_lag']:.6f}")])
+    _metric(lines, "chickbot_event_loop_blocks_total", "counter",
+            "Times the event loop was blocked past the threshold, by the module blamed for it.",
+            [(_labels(module=module), count) for module, count in sorted(loop_monitor.blocks_by_module.items())])
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,171 @@
+import asyncio
+import itertools
+import logging
+import math
+import statistics
+import time
+from collections import deque
+
+import tracing
+
+# Outbound Discord message queue. The poller hands messages to post() and carries on; one worker per
+# channel sends them, with at most MAX_CONCURRENT_SENDS posts in flight across all channels. Messages that
+# pile up for a channel while its worker waits on a rate limit are merged into as few posts as possible,
+# and @everyone promo alerts go out ahead of everything else.
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_PROMO = 0  # @everyone free sandwich alerts
+PRIORITY_NORMAL = 1  # announcements, "game finished" and no-sandwich messages
+
+MAX_MESSAGE_LENGTH = 2000  # Discord's limit for a single message
+
+# Discord allows about 5 messages per 5 seconds in a channel and 50 requests per second per bot
+CHANNEL_RATE = (5, 5.0)
+GLOBAL_RATE = (50, 1.0)
+MAX_CONCURRENT_SENDS = 16  # posts in flight at once across all channels
+
+stats = {
+    "queued": 0,  # messages handed to post()
+    "posts": 0,  # Discord messages actually sent
+    "merged": 0,  # messages that shared a post with another message
+    "failed": 0,  # messages whose post raised
+}
+send_latencies = deque(maxlen=500)  # seconds from post() to the message being sent, most recent last
+
+
+# sliding-window rate limit: at most "limit" acquisitions in any "window" seconds
+class RateBucket:
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self._sent = deque()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            while self._sent and now - self._sent[0] >= self.window:
+                self._sent.popleft()
+            if len(self._sent) < self.limit:
+                self._sent.append(now)
+                return
+            await asyncio.sleep(self.window - (now - self._sent[0]))
+
+
+class OutboundMessage:
+    def __init__(self, content, priority, delete_after):
+        self.content = content
+        self.priority = priority
+        self.delete_after = delete_after
+        self.queued_at = time.monotonic()
+
+
+_sequence = itertools.count()
+_queues = {}  # channel key -> asyncio.PriorityQueue of (priority, sequence, OutboundMessage)
+_workers = {}  # channel key -> worker task
+_channel_buckets = {}
+_global_bucket = RateBucket(*GLOBAL_RATE)
+_send_slots = asyncio.Semaphore(MAX_CONCURRENT_SENDS)
+
+
+def _channel_key(channel):
+    return getattr(channel, "id", None) or id(channel)
+
+
+# queues a message for the channel and returns immediately
+def post(channel, content, priority=PRIORITY_NORMAL, delete_after=None):
+    if channel is None:
+        logger.error(f"Dropping message for a missing channel: {content[:50]}")
+        return
+
+    key = _channel_key(channel)
+    if key not in _queues:
+        _queues[key] = asyncio.PriorityQueue()
+        _channel_buckets[key] = RateBucket(*CHANNEL_RATE)
+    _queues[key].put_nowait((priority, next(_sequence), OutboundMessage(content, priority, delete_after)))
+    stats["queued"] += 1
+
+    worker = _workers.get(key)
+    if worker is None or worker.done():
+        _workers[key] = asyncio.get_running_loop().create_task(_drain(key, channel))
+
+
+# groups messages (in the order they were queued) into posts that fit Discord's length limit
+def merge(messages):
+    posts = []
+    for message in messages:
+        if posts and sum(len(m.content) + 1 for m in posts[-1]) + len(message.content) <= MAX_MESSAGE_LENGTH:
+            posts[-1].append(message)
+        else:
+            posts.append([message])
+    # a post containing a promo alert goes out first
+    return sorted(posts, key=lambda batch: min(m.priority for m in batch))
+
+
+async def _drain(key, channel):
+    queue = _queues[key]
+    while not queue.empty():
+        batch = [(await queue.get())]
+        await _channel_buckets[key].acquire()
+        await _global_bucket.acquire()
+
+        # everything queued while waiting for the rate limit joins this post
+        while not queue.empty():
+            batch.append(queue.get_nowait())
+        messages = [message for _, _, message in sorted(batch, key=lambda entry: entry[1])]
+
+        posts = merge(messages)
+        for index, post_messages in enumerate(posts):
+            if index:
+                await _channel_buckets[key].acquire()
+                await _global_bucket.acquire()
+            await _send(channel, post_messages)
+        for _ in batch:
+            queue.task_done()
+
+
+async def _send(channel, messages):
+    delete_after = None
+    if all(m.delete_after is not None for m in messages):
+        delete_after = min(m.delete_after for m in messages)
+    try:
+        async with _send_slots:
+            with tracing.span("discord send", messages=len(messages)):
+                await channel.send("\n".join(m.content for m in messages), delete_after=delete_after)
+    except Exception as e:
+        stats["failed"] += len(messages)
+        logger.error(f"Error sending {len(messages)} message(s): {e}")
+        return
+
+    now = time.monotonic()
+    stats["posts"] += 1
+    if len(messages) > 1:
+        stats["merged"] += len(messages)
+    send_latencies.extend(now - m.queued_at for m in messages)
+
+
+# replaces the rate limits, e.g. for a stand-in channel that has none (benchmark.py)
+def set_rate_limits(channel_rate, global_rate):
+    global CHANNEL_RATE, GLOBAL_RATE, _global_bucket
+    CHANNEL_RATE, GLOBAL_RATE = channel_rate, global_rate
+    _global_bucket = RateBucket(*global_rate)
+    for key in _channel_buckets:
+        _channel_buckets[key] = RateBucket(*channel_rate)
+
+
+# waits until every queued message has been sent
+async def flush():
+    await asyncio.gather(*(queue.join() for queue in _queues.values()))
+
+
+# returns the number of messages waiting to be sent
+def depth():
+    return sum(queue.qsize() for queue in _queues.values())
+
+
+# returns the send counters together with the queue depth and send latency percentiles in seconds
+def get_stats():
+    latencies = sorted(send_latencies)
+    p50 = statistics.median(latencies) if latencies else 0.0
+    p95 = latencies[math.ceil(0.95 * len(latencies)) - 1] if latencies else 0.0
+    return dict(stats, depth=depth(), latency_p50=p50, latency_p95=p95)
@@ -0,0 +1,73 @@
+import datetime
+import logging
+
+# Start-time-aware polling cadence. Nothing can be announced before a game ends, so instead of polling
+# every 5 minutes all day the poller sleeps until shortly before the scheduled start, then polls at an
+# interval that shrinks as the expected end of the game approaches.
+
+logger = logging.getLogger(__name__)
+
+# typical length of a home game, used to estimate when the result will be available
+GAME_DURATIONS = {
+    "LAFC": datetime.timedelta(hours=1, minutes=55),
+    "Ducks": datetime.timedelta(hours=2, minutes=30),
+    "Clippers": datetime.timedelta(hours=2, minutes=15),
+    "Angels": datetime.timedelta(hours=3),
+}
+
+PRE_GAME_LEAD = datetime.timedelta(minutes=5)  # first poll this long before the scheduled start
+MIN_INTERVAL = 60  # seconds between polls once the game is expected to be over
+MAX_INTERVAL = 900  # seconds between polls early in the game
+LONG_DELAY_INTERVAL = 300  # seconds between polls once a game runs an hour past its expected end (rain delays)
+FALLBACK_INTERVAL = 300  # seconds between polls when the start time is unknown, same as the old fixed cadence
+
+
+# returns the number of seconds to wait before polling a game that starts at "start"
+def next_poll_delay(team, start, now):
+    if start is None:
+        return FALLBACK_INTERVAL
+
+    # before kickoff, sleep until just before the game starts
+    first_poll = start - PRE_GAME_LEAD
+    if now < first_poll:
+        return (first_poll - now).total_seconds()
+
+    # during the game, poll a quarter of the remaining time, but never faster than MIN_INTERVAL
+    remaining = (start + GAME_DURATIONS[team] - now).total_seconds()
+    if remaining < -3600:
+        return LONG_DELAY_INTERVAL
+    return min(MAX_INTERVAL, max(MIN_INTERVAL, remaining / 4))
+
+
+# estimates the polls needed from "since" until the game is over, compared to fixed 5-minute polling,
+# and the worst-case notification delay of each cadence once the game is expected to finish
+def estimate_savings(team, start, since):
+    if start is None:
+        return None
+
+    expected_end = start + GAME_DURATIONS[team]
+    adaptive_polls = 0
+    now = since
+    while now < expected_end:
+        now += datetime.timedelta(seconds=next_poll_delay(team, start, now))
+        adaptive_polls += 1
+
+    fixed_polls = int((expected_end - since).total_seconds() // FALLBACK_INTERVAL) + 1
+    return {
+        "adaptive_polls": adaptive_polls,
+        "fixed_polls": fixed_polls,
+        "saved_polls": fixed_polls - adaptive_polls,
+        "adaptive_latency": next_poll_delay(team, start, expected_end),
+        "fixed_latency": FALLBACK_INTERVAL,
+    }
+
+
+# logs the expected request savings for a game discovered at "since"
+def log_plan(team, start, since):
+    estimate = estimate_savings(team, start, since)
+    if estimate is None:
+        logger.info(f"No start time for today's {team} game, polling every {FALLBACK_INTERVAL}s")
+        return
+    logger.info(f"{team} starts at {start.isoformat()}: ~{estimate['adaptive_polls']} polls instead of "
+                f"{estimate['fixed_polls']} ({estimate['saved_polls']} saved), notification delay up to "
+                f"{estimate['adaptive_latency']:.0f}s instead of {estimate['fixed_latency']}s")
@@ -1,4 +1,6 @@
-from datetime import datetime
+import asyncio
+import logging
+from datetime import datetime, timedelta
 import pytz
 from random import randint
 
@@ -6,12 +8,46 @@ import Anaheim_Ducks
 import LAFC
 import LA_Angels
 import LA_Clippers
+import subscriptions
+import tracing
 
 pacific_tz = pytz.timezone("America/Los_Angeles")
 
+logger = logging.getLogger(__name__)
 
-# returns phrases the bot will respond with given a command
-async def get_response(user_input: str, bot_mention: str) -> str:
+# The "next chance" reply is kept in memory as (text, computed at) and recomputed in the background whenever
+# a team's schedule changes or the date rolls over, so answering the command is a lookup instead of four
+# schedule queries.
+next_chance_answer = None
+_refresh_task = None
+_refresh_pending = False
+_rollover_task = None
+_retry_handle = None  # asyncio.TimerHandle of the next retry after a team was skipped
+_retry_delay = None  # seconds until that retry, doubled after every reply that skipped a team
+
+
+# command names recorded on the "command" trace spans, in the order get_response matches them
+TRACED_COMMANDS = ('hello', 'how are you', 'bye', 'roll dice', 'unsubscribe', 'subscribe', 'subscriptions',
+                   'next chance', 'next clippers game', 'next ducks game', 'next lafc game', 'next angels game')
+
+
+# returns phrases the bot will respond with given a command, timed as a "command" trace span
+async def get_response(user_input: str, bot_mention: str, channel_id: int = None, guild_id: int = None,
+                       can_manage: bool = False) -> str:
+    lowered = user_input.lower().replace(bot_mention, '').strip()
+    command = next((name for name in TRACED_COMMANDS if name in lowered), 'other')
+    with tracing.span("command", command=command) as attributes:
+        try:
+            return await respond(user_input, bot_mention, channel_id, guild_id, can_manage)
+        except Exception as e:
+            # a team's schedule could not be loaded, the user still gets a reply
+            logger.error(f"Error answering {command!r}: {e}")
+            attributes["error"] = type(e).__name__
+            return "I couldn't look that up right now, try again in a bit."
+
+
+async def respond(user_input: str, bot_mention: str, channel_id: int = None, guild_id: int = None,
+                  can_manage: bool = False) -> str:
     # Remove bot mention from the user_input to get the actual command
     lowered = user_input.lower().replace(bot_mention, '').strip()
 
@@ -25,54 +61,183 @@ async def get_response(user_input: str, bot_mention: str) -> str:
         return 'See you!'
     elif 'roll dice' in lowered:
         return f'You rolled: {randint(1, 6)}'
+    elif 'unsubscribe' in lowered or 'subscribe' in lowered:
+        return subscription_response(lowered, channel_id, guild_id, can_manage)
+    elif 'subscriptions' in lowered:
+        if channel_id is None:
+            return "Subscriptions are set per channel, ask me in a server channel."
+        teams = subscriptions.teams_for(channel_id)
+        return f"This channel gets alerts for: {', '.join(teams)}" if teams else "This channel has no subscriptions."
     elif 'next chance' in lowered:
         next_game = await next_chance()
         return next_game
     elif 'next clippers game' in lowered:
-        clippers_date, clippers_opp = LA_Clippers.get_next_clippers_home_game()
-        clippers_date = datetime.strptime(clippers_date, "%Y-%m-%d") if clippers_date else None
+        clippers_date, clippers_opp = await LA_Clippers.get_next_clippers_home_game()
+        if not clippers_date:
+            return "There are no scheduled Clippers Home Games coming up."
+        clippers_date = datetime.strptime(clippers_date, "%Y-%m-%d")
         return (f"The next Clippers Home Game:\n\tGAME: Los Angeles Clippers vs. {clippers_opp}"
                 f"\n\tDATE: {clippers_date.strftime('%b %d, %Y')}")
     elif 'next ducks game' in lowered:
-        duck_date, duck_opp = await Anaheim_Ducks.get_ducks_next_home_game()  # Await here
-        duck_date = datetime.strptime(duck_date, "%Y-%m-%d") if duck_date else None
+        duck_date, duck_opp = await Anaheim_Ducks.get_ducks_next_home_game()
+        if not duck_date:
+            return "There are no scheduled Ducks Home Games coming up."
+        duck_date = datetime.strptime(duck_date, "%Y-%m-%d")
         return f"The next Ducks Home Game:\n\tGAME: Anaheim Ducks vs. {duck_opp}\n\tDATE: {duck_date.strftime('%b %d, %Y')}"
     elif 'next lafc game' in lowered:
         lafc_date, lafc_opp = await LAFC.get_next_lafc_home_game()
-        if lafc_date == "No upcoming LAFC home games found." :
+        if not lafc_date:
             return "There are no scheduled LAFC Home Games coming up. Try again in January for next years schedule."
         else:
-            lafc_date = datetime.strptime(lafc_date, "%Y-%m-%d") if lafc_date else None
+            lafc_date = datetime.strptime(lafc_date, "%Y-%m-%d")
             return f"The next LAFC Home Game:\n\tGAME: LAFC vs. {lafc_opp}\n\tDATE: {lafc_date.strftime('%b %d, %Y')}"
     elif 'next angels game' in lowered:
-        angels_date, angels_opp = LA_Angels.get_next_angels_game()
-        angels_date = datetime.strptime(angels_date, "%Y-%m-%d") if angels_date else None
+        angels_date, angels_opp = await LA_Angels.get_next_angels_game()
+        if not angels_date:
+            return "There are no scheduled Angels Home Games coming up."
+        angels_date = datetime.strptime(angels_date, "%Y-%m-%d")
         return f"The next Angels Home Game:\n\tGAME: Los Angeles Angels vs. {angels_opp}\n\tDATE: {angels_date.strftime('%b %d, %Y')}"
     else:
         return 'I don\'t understand that command.'
 
 
+# handles "subscribe [teams]" and "unsubscribe [teams]" for the channel the command was sent in
+def subscription_response(lowered, channel_id, guild_id, can_manage):
+    if channel_id is None:
+        return "Subscriptions are set per channel, ask me in a server channel."
+    if not can_manage:
+        return "You need the Manage Channels permission to change this channel's subscriptions."
+
+    teams = subscriptions.parse_teams(lowered)
+    if 'unsubscribe' in lowered:
+        remaining = subscriptions.unsubscribe(channel_id, teams)
+        return f"Unsubscribed. This channel now gets alerts for: {', '.join(remaining) if remaining else 'no teams'}"
+    subscribed = subscriptions.subscribe(channel_id, guild_id, teams)
+    return f"Subscribed! This channel now gets alerts for: {', '.join(subscribed)}"
+
+
+# returns the precomputed "next chance" reply, computing it first if it is missing or from a previous day
 async def next_chance():
-    # Get upcoming game dates and opponents
-    lafc_date, lafc_opp = await LAFC.get_next_lafc_home_game()
-    duck_date, duck_opp_loc, duck_opp = await Anaheim_Ducks.get_ducks_next_home_game()  # Await here
-    angels_date, angels_opp = LA_Angels.get_next_angels_game()
-    clippers_date, clippers_opp = LA_Clippers.get_next_clippers_home_game()
+    if next_chance_answer is None or next_chance_answer[1].date() != datetime.now(pacific_tz).date():
+        await asyncio.shield(request_next_chance_refresh())
+    if next_chance_answer is None:
+        return "I couldn't look up the schedules right now, try again in a bit."
 
-    # Convert dates to datetime objects for comparison
-    today = datetime.now(pacific_tz)
+    text, computed_at = next_chance_answer
+    return f"{text}\n\t_Updated {computed_at.strftime('%I:%M %p').lstrip('0')} PT_"
+
+
+# starts recomputing the "next chance" reply, or queues one more run if a refresh is already in progress
+def request_next_chance_refresh(*_):
+    global _refresh_task, _refresh_pending
+    if _refresh_task is not None and not _refresh_task.done():
+        _refresh_pending = True
+        return _refresh_task
+    _refresh_task = asyncio.get_running_loop().create_task(_refresh_next_chance())
+    return _refresh_task
+
+
+async def _refresh_next_chance():
+    global next_chance_answer, _refresh_pending
+    while True:
+        _refresh_pending = False
+        try:
+            reply, skipped = await compute_next_chance()
+            next_chance_answer = (reply, datetime.now(pacific_tz))
+            _schedule_retry(skipped)
+        except Exception as e:
+            logger.error(f"Error computing the next chance reply: {e}")
+        if not _refresh_pending:
+            return
+
+
+# retries a reply that skipped a team after NEXT_CHANCE_RETRY, backing off exponentially up to
+# NEXT_CHANCE_MAX_RETRY while the team keeps failing, and stops retrying once every team answered
+def _schedule_retry(skipped):
+    global _retry_handle, _retry_delay
+    if _retry_handle is not None:
+        _retry_handle.cancel()
+        _retry_handle = None
+    if not skipped:
+        _retry_delay = None
+        return
+    _retry_delay = NEXT_CHANCE_RETRY if _retry_delay is None else min(2 * _retry_delay, NEXT_CHANCE_MAX_RETRY)
+    logger.info(f"Retrying the next chance reply for {', '.join(skipped)} in {_retry_delay}s")
+    _retry_handle = asyncio.get_running_loop().call_later(_retry_delay, request_next_chance_refresh)
 
-    lafc_date = datetime.strptime(lafc_date, "%Y-%m-%d") if lafc_date != "No upcoming LAFC home games found." else None
-    duck_date = datetime.strptime(duck_date, "%Y-%m-%d") if duck_date else None
-    angels_date = datetime.strptime(angels_date, "%Y-%m-%d") if angels_date else None
-    clippers_date = datetime.strptime(clippers_date, "%Y-%m-%d") if clippers_date else None
+
+# recomputes the "next chance" reply now and again just after every midnight, safe to call more than once
+def start_next_chance_refresher():
+    global _rollover_task
+    if _rollover_task is None or _rollover_task.done():
+        _rollover_task = asyncio.get_running_loop().create_task(_refresh_at_midnight())
+
+
+async def _refresh_at_midnight():
+    while True:
+        await asyncio.shield(request_next_chance_refresh())
+        now = datetime.now(pacific_tz)
+        midnight = pacific_tz.localize(datetime.combine(now.date() + timedelta(days=1), datetime.min.time()))
+        await asyncio.sleep((midnight - now).total_seconds() + 1)
+
+
+# a schedule whose games changed may change the answer
+for _schedule in (LAFC.season_schedule, Anaheim_Ducks.season_schedule, LA_Angels.season_schedule,
+                  LA_Clippers.season_schedule):
+    _schedule.add_listener(request_next_chance_refresh)
+
+
+# team name -> lookup returning the (date, opponent) of its next home game
+NEXT_GAME_LOOKUPS = {
+    "LAFC": LAFC.get_next_lafc_home_game,
+    "Anaheim Ducks": Anaheim_Ducks.get_ducks_next_home_game,
+    "Los Angeles Angels": LA_Angels.get_next_angels_game,
+    "Los Angeles Clippers": LA_Clippers.get_next_clippers_home_game,
+}
+NEXT_CHANCE_DEADLINE = 10  # seconds the next chance lookups may take together
+NEXT_CHANCE_RETRY = 60  # seconds before recomputing a reply that skipped a team
+NEXT_CHANCE_MAX_RETRY = 30 * 60  # longest wait between retries while a team keeps failing
+
+
+# runs every team's next home game lookup at once and returns ({team: (date, opponent)}, skipped teams)
+# for the lookups that answered before the deadline; slow lookups keep running and fill their schedule index
+async def fetch_next_games(deadline=NEXT_CHANCE_DEADLINE):
+    tasks = {team: asyncio.ensure_future(lookup()) for team, lookup in NEXT_GAME_LOOKUPS.items()}
+    await asyncio.wait(tasks.values(), timeout=deadline)
+
+    next_games = {}
+    skipped = []
+    for team, task in tasks.items():
+        if not task.done():
+            logger.warning(f"{team} next game lookup missed the {deadline}s deadline")
+            task.add_done_callback(_discard_result)
+            skipped.append(team)
+            continue
+        if task.cancelled() or task.exception():
+            logger.error(f"{team} next game lookup failed: {'cancelled' if task.cancelled() else task.exception()}")
+            skipped.append(team)
+            continue
+        next_games[team] = task.result()
+    return next_games, skipped
+
+
+def _discard_result(task):
+    if not task.cancelled() and task.exception():
+        logger.error(f"Late next game lookup failed: {task.exception()}")
+
+
+# returns the next chance reply and the teams left out of it
+async def compute_next_chance():
+    # Get upcoming game dates and opponents from each team's season schedule index
+    next_games, skipped = await fetch_next_games()
+
+    # Convert dates to datetime objects for comparison
+    today = datetime.now(pacific_tz).replace(tzinfo=None)
 
     # Create a dictionary to store team and game data
     game_data = {
-        "LAFC": {"date": lafc_date, "opponent": lafc_opp},
-        "Anaheim Ducks": {"date": duck_date, "opponent": duck_opp_loc + " " + duck_opp},
-        "Los Angeles Angels": {"date": angels_date, "opponent": angels_opp},
-        "Los Angeles Clippers": {"date": clippers_date, "opponent": clippers_opp},
+        team: {"date": datetime.strptime(game_date, "%Y-%m-%d") if game_date else None, "opponent": opponent}
+        for team, (game_date, opponent) in next_games.items()
     }
 
     # Find the team with the closest upcoming game
@@ -87,11 +252,15 @@ async def next_chance():
             closest_team = team
             closest_opponent = data["opponent"]
 
-    if closest_date.strftime("%Y-%m-%d") == today.strftime("%Y-%m-%d"):
-        return (f"There's a chance **TODAY** for a free Chick-Fil-A sandwich is for the following game: "
-                f"\n\tGAME: {closest_team} vs {closest_opponent} \n\tDATE: {closest_date.strftime('%b %d, %Y')}")
+    if closest_date and closest_date.strftime("%Y-%m-%d") == today.strftime("%Y-%m-%d"):
+        reply = (f"There's a chance **TODAY** for a free Chick-Fil-A sandwich is for the following game: "
+                 f"\n\tGAME: {closest_team} vs {closest_opponent} \n\tDATE: {closest_date.strftime('%b %d, %Y')}")
     elif closest_team:
-        return (f"The next chance for a free Chick-Fil-A sandwich is for the following game: "
-                f"\n\tGAME: {closest_team} vs {closest_opponent} \n\tDATE: {closest_date.strftime('%b %d, %Y')}")
+        reply = (f"The next chance for a free Chick-Fil-A sandwich is for the following game: "
+                 f"\n\tGAME: {closest_team} vs {closest_opponent} \n\tDATE: {closest_date.strftime('%b %d, %Y')}")
     else:
-        return "No upcoming games found."
+        reply = "No upcoming games found."
+
+    if skipped:
+        reply += f"\n\t_Couldn't check: {', '.join(skipped)}_"
+    return reply, skipped
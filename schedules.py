@@ -0,0 +1,161 @@
+import asyncio
+import bisect
+import logging
+import time
+from datetime import datetime, date, timezone
+from typing import NamedTuple, Optional
+
+import pytz
+
+import tracing
+
+# In-memory season schedule index for each team. The full season is downloaded at most once a day (or when
+# a caller invalidates it), and "next game" / "game today" questions become bisect lookups on the sorted
+# home game dates instead of re-downloading and re-scanning the season every time.
+#
+# A schedule can also be given a TTL and serve stale-while-revalidate: once it has been loaded, an expired
+# index keeps answering immediately while a single background task downloads the season again, so chat
+# replies never wait on a slow or rate-limited upstream.
+
+logger = logging.getLogger(__name__)
+
+pacific_tz = pytz.timezone("America/Los_Angeles")
+
+# seconds before a failed download is tried again, whether or not a copy is cached
+REVALIDATE_RETRY_SECONDS = 300
+
+
+class HomeGame(NamedTuple):
+    date: date
+    opponent: str
+    start: Optional[datetime] = None  # scheduled first pitch / puck drop / tip-off / kickoff, timezone aware
+    game_id: Optional[str] = None  # the league's ID for the game, when the schedule has one
+
+
+class SeasonSchedule:
+    def __init__(self, team, loader, ttl=None, stale_while_revalidate=False):
+        self.team = team
+        self._loader = loader  # coroutine function returning the team's home games for the season
+        self.ttl = ttl  # seconds the index is used before downloading again, on top of the daily refresh
+        self.stale_while_revalidate = stale_while_revalidate
+        self._games = []
+        self._dates = []
+        self._lock = asyncio.Lock()
+        self._listeners = []
+        self._refresh_task = None
+        self._failed_at = None
+        self.refreshed_on = None
+        self.refreshed_at = None  # time.monotonic() of the last download
+
+    # registers a callback that is called with this schedule whenever its games change
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    # forces the next lookup to download the season again
+    def invalidate(self):
+        self.refreshed_on = None
+
+    # drops the index, so the next lookup waits for a download even with stale-while-revalidate
+    def clear(self):
+        self.invalidate()
+        self._games = []
+        self._dates = []
+        self._failed_at = None
+
+    # returns True if the index was downloaded today and is within its TTL
+    def is_fresh(self):
+        if self.refreshed_on != datetime.now(pacific_tz).date():
+            return False
+        return self.ttl is None or time.monotonic() - self.refreshed_at < self.ttl
+
+    # downloads the season and rebuilds the index, returns True if the home games changed
+    async def refresh(self):
+        with tracing.span("schedule refresh", team=self.team):
+            games = sorted(await self._loader(), key=lambda game: game.date)
+        changed = games != self._games
+        self._games = games
+        self._dates = [game.date for game in games]
+        self.refreshed_on = datetime.now(pacific_tz).date()
+        self.refreshed_at = time.monotonic()
+        self._failed_at = None
+        logger.debug(f"Indexed {len(games)} {self.team} home games (changed: {changed})")
+
+        if changed:
+            for callback in self._listeners:
+                try:
+                    callback(self)
+                except Exception as e:
+                    logger.error(f"Error notifying {self.team} schedule listener: {e}")
+        return changed
+
+    # refreshes the index once per day (or once per TTL), keeping the previous copy if the download fails
+    async def ensure_fresh(self):
+        if self.is_fresh() or self._backing_off():
+            return
+
+        # answer from the stale copy and let a background task download the season
+        if self.stale_while_revalidate and self._games:
+            self.refresh_in_background()
+            return
+
+        async with self._lock:
+            if self.is_fresh() or self._backing_off():
+                return
+            await self._refresh_or_keep()
+
+    async def _refresh_or_keep(self):
+        try:
+            await self.refresh()
+        except Exception as e:
+            self._failed_at = time.monotonic()
+            if not self._games:
+                raise
+            logger.error(f"Error refreshing {self.team} schedule, using the cached copy: {e}")
+
+    # returns True while the last download failed less than REVALIDATE_RETRY_SECONDS ago and the cached copy
+    # should answer instead, and raises when there is no copy, so a failing upstream is not asked on every lookup
+    def _backing_off(self):
+        if self._failed_at is None or time.monotonic() - self._failed_at >= REVALIDATE_RETRY_SECONDS:
+            return False
+        if not self._games:
+            raise RuntimeError(f"{self.team} schedule download failed less than {REVALIDATE_RETRY_SECONDS}s ago")
+        return True
+
+    # starts a background refresh unless one is already running or the last one failed recently
+    def refresh_in_background(self):
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return self._refresh_task
+        if self._failed_at is not None and time.monotonic() - self._failed_at < REVALIDATE_RETRY_SECONDS:
+            return None
+        self._refresh_task = asyncio.create_task(self._revalidate())
+        return self._refresh_task
+
+    async def _revalidate(self):
+        async with self._lock:
+            if self.is_fresh():
+                return
+            try:
+                await self._refresh_or_keep()
+            except Exception as e:
+                logger.error(f"Error refreshing {self.team} schedule in the background: {e}")
+                self._failed_at = time.monotonic()
+
+    # returns the first home game on or after the given day (today by default)
+    async def next_game(self, day=None) -> Optional[HomeGame]:
+        await self.ensure_fresh()
+        day = day or datetime.now(pacific_tz).date()
+        index = bisect.bisect_left(self._dates, day)
+        return self._games[index] if index < len(self._games) else None
+
+    # returns the home game on the given day (today by default), or None
+    async def game_on(self, day=None) -> Optional[HomeGame]:
+        day = day or datetime.now(pacific_tz).date()
+        game = await self.next_game(day)
+        return game if game is not None and game.date == day else None
+
+
+# parses an upstream UTC timestamp such as "2024-10-10T02:00:00Z"
+def parse_utc(timestamp):
+    if not timestamp:
+        return None
+    return datetime.fromisoformat(timestamp.replace("Z", "+00:00")).astimezone(timezone.utc)
@@ -0,0 +1,66 @@
+import asyncio
+import logging
+import time
+
+import http_cache
+
+# Request coalescing for endpoints that several functions read within the same cycle or chat burst (the
+# NHL scoreboard and today's MLB schedule). Callers asking for the same URL share one in-flight request,
+# and its parsed result is reused for a few seconds, so back-to-back callers don't fetch and parse again.
+# Results are shared between callers and must not be modified.
+
+logger = logging.getLogger(__name__)
+
+# seconds a parsed result is reused after its request completes
+DEFAULT_TTL = 15
+
+stats = {
+    "calls": 0,  # calls made through the single-flight layer
+    "fetches": 0,  # calls that actually went to http_cache / upstream
+    "coalesced": 0,  # calls answered by an in-flight or recently finished request for the same key
+}
+
+_inflight = {}  # key -> task fetching it
+_results = {}  # key -> (expires at, result)
+
+
+# runs "fetch" for the key unless the same key is already being fetched or was fetched in the last ttl
+# seconds, in which case that result (or exception) is shared
+async def run(key, fetch, ttl=DEFAULT_TTL):
+    stats["calls"] += 1
+    cached = _results.get(key)
+    if cached is not None and cached[0] > time.monotonic():
+        stats["coalesced"] += 1
+        return cached[1]
+
+    task = _inflight.get(key)
+    if task is not None:
+        stats["coalesced"] += 1
+    else:
+        stats["fetches"] += 1
+        task = asyncio.create_task(fetch())
+        _inflight[key] = task
+        task.add_done_callback(lambda done: _finish(key, done, ttl))
+    # shield so one caller being cancelled doesn't cancel the request the others are waiting on
+    return await asyncio.shield(task)
+
+
+def _finish(key, task, ttl):
+    if _inflight.get(key) is task:
+        del _inflight[key]
+    # the URLs carry the date, so expired keys are dropped here instead of piling up day after day
+    now = time.monotonic()
+    for expired in [name for name, (expires_at, _) in _results.items() if expires_at <= now]:
+        del _results[expired]
+    if not task.cancelled() and task.exception() is None:
+        _results[key] = (now + ttl, task.result())
+
+
+# returns the parsed JSON body of the url, shared with concurrent and recent callers
+async def get_json(url, ttl=DEFAULT_TTL, **kwargs):
+    return await run(url, lambda: http_cache.get_json(url, **kwargs), ttl)
+
+
+# drops every remembered result
+def clear():
+    _results.clear()
@@ -0,0 +1,35 @@
+import json
+import logging
+import os
+import time
+
+import json_files
+
+# Snapshot of the team pollers' state, persisted to a local JSON file so a restart resumes where the bot
+# left off instead of discovering today's games again and repeating their announcements:
+#   {"saved_at": <unix time>, "teams": {"LAFC": {"day": "2024-05-04", "has_game": true, ...}, ...}}
+# The file is rewritten on every state transition (a discovery or a finished game).
+
+logger = logging.getLogger(__name__)
+
+STATE_PATH = os.getenv("POLLER_STATE_PATH", "poller_state.json")
+
+
+# returns the saved snapshot of each team's state, or nothing when there is none or it cannot be read
+def load():
+    try:
+        with open(STATE_PATH) as f:
+            return json.load(f).get("teams", {})
+    except FileNotFoundError:
+        return {}
+    except (ValueError, OSError, AttributeError) as e:
+        logger.error(f"Error reading {STATE_PATH}, starting without saved poller state: {e}")
+        return {}
+
+
+# writes the snapshot, logging instead of raising so a full disk never stops a poller
+def save(teams):
+    try:
+        json_files.write_atomic(STATE_PATH, {"saved_at": round(time.time(), 3), "teams": teams}, indent=2)
+    except OSError as e:
+        logger.error(f"Error writing {STATE_PATH}: {e}")
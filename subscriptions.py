@@ -0,0 +1,105 @@
+import json
+import logging
+import os
+
+import json_files
+
+# Which channels receive which team's game alerts, persisted to a local JSON file:
+#   {"<channel id>": {"guild_id": <guild id or null>, "teams": ["LAFC", "Ducks", ...]}}
+# Game results are evaluated once and the resulting messages are posted to every subscribed channel.
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIPTIONS_PATH = os.getenv("SUBSCRIPTIONS_PATH", "subscriptions.json")
+
+TEAMS = ("LAFC", "Ducks", "Clippers", "Angels")
+
+# words accepted in the subscribe commands for each team
+TEAM_ALIASES = {
+    "lafc": "LAFC",
+    "ducks": "Ducks",
+    "anaheim": "Ducks",
+    "clippers": "Clippers",
+    "angels": "Angels",
+}
+
+_subscriptions = None  # channel id -> {"guild_id": ..., "teams": [...]}
+_channels_by_team = {}  # team -> set of channel ids, rebuilt whenever the subscriptions change
+
+
+def _load():
+    global _subscriptions
+    if _subscriptions is not None:
+        return _subscriptions
+
+    try:
+        with open(SUBSCRIPTIONS_PATH) as f:
+            _subscriptions = {int(channel_id): entry for channel_id, entry in json.load(f).items()}
+    except FileNotFoundError:
+        _subscriptions = {}
+    except (ValueError, OSError) as e:
+        logger.error(f"Error reading {SUBSCRIPTIONS_PATH}, starting without subscriptions: {e}")
+        _subscriptions = {}
+    _reindex()
+    return _subscriptions
+
+
+def _reindex():
+    _channels_by_team.clear()
+    for team in TEAMS:
+        _channels_by_team[team] = {channel_id for channel_id, entry in _subscriptions.items()
+                                   if team in entry["teams"]}
+
+
+def _save():
+    data = {str(channel_id): entry for channel_id, entry in _subscriptions.items()}
+    json_files.write_atomic(SUBSCRIPTIONS_PATH, data, indent=2)
+
+
+# returns the teams named in a command ("subscribe ducks angels"), or every team when none are named
+def parse_teams(text):
+    teams = [team for word, team in TEAM_ALIASES.items() if word in text.lower()]
+    return sorted(set(teams), key=TEAMS.index) if teams else list(TEAMS)
+
+
+# subscribes the channel to the teams' alerts and returns the channel's teams
+def subscribe(channel_id, guild_id, teams):
+    subscriptions = _load()
+    entry = subscriptions.setdefault(channel_id, {"guild_id": guild_id, "teams": []})
+    entry["teams"] = [team for team in TEAMS if team in entry["teams"] or team in teams]
+    _reindex()
+    _save()
+    return entry["teams"]
+
+
+# unsubscribes the channel from the teams' alerts and returns the channel's remaining teams
+def unsubscribe(channel_id, teams):
+    subscriptions = _load()
+    entry = subscriptions.get(channel_id)
+    if entry is None:
+        return []
+    entry["teams"] = [team for team in entry["teams"] if team not in teams]
+    if not entry["teams"]:
+        del subscriptions[channel_id]
+    _reindex()
+    _save()
+    return entry["teams"]
+
+
+# returns the teams the channel is subscribed to
+def teams_for(channel_id):
+    entry = _load().get(channel_id)
+    return list(entry["teams"]) if entry else []
+
+
+# returns the ids of the channels subscribed to the team
+def channels_for(team):
+    _load()
+    return _channels_by_team.get(team, set())
+
+
+# subscribes the configured DISCORD_CHANNEL_ID to every team the first time the bot runs
+def ensure_default(channel_id):
+    if not _load() and not os.path.exists(SUBSCRIPTIONS_PATH):
+        logger.info(f"No subscriptions yet, subscribing channel {channel_id} to every team")
+        subscribe(channel_id, None, TEAMS)
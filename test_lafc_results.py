@@ -0,0 +1,62 @@
+from datetime import date, datetime, time
+
+import pytest
+
+import LAFC
+import benchmark_fixtures
+
+LAFC_TEAM = {"id": LAFC.FOOTBALL_DATA_TEAM_ID, "name": "Los Angeles FC"}
+OTHER_TEAM = {"id": 741, "name": "Seattle Sounders"}
+
+
+def matches(utc_date, status="FINISHED", winner=None, lafc_home=True):
+    home, away = (LAFC_TEAM, OTHER_TEAM) if lafc_home else (OTHER_TEAM, LAFC_TEAM)
+    return {"matches": [{"utcDate": utc_date, "status": status, "homeTeam": home, "awayTeam": away,
+                         "score": {"winner": winner}}]}
+
+
+@pytest.mark.parametrize("data, expected", [
+    (matches("2024-05-04T20:00:00Z", winner="HOME_TEAM"), "Win"),
+    (matches("2024-05-04T20:00:00Z", winner="HOME_TEAM", lafc_home=False), "Lose"),
+    (matches("2024-05-04T20:00:00Z", winner="AWAY_TEAM", lafc_home=False), "Win"),
+    (matches("2024-05-04T20:00:00Z", winner="DRAW"), "Draw"),
+    (matches("2024-05-04T20:00:00Z", status="IN_PLAY"), "The game has not finished yet!"),
+    (matches("2024-05-05T20:00:00Z", winner="HOME_TEAM"), "The game has not finished yet!"),
+    ({"matches": []}, "The game has not finished yet!"),
+], ids=["home win", "away loss", "away win", "draw", "not finished", "other day", "no match"])
+def test_parse_football_data_results(data, expected):
+    assert LAFC.parse_football_data_results(data, date(2024, 5, 4)) == expected
+
+
+# a 7:30 pm kickoff in Los Angeles is 02:30 the next day in UTC, and still counts as that evening's match
+def test_parse_football_data_results_evening_kickoff():
+    data = matches("2024-05-05T02:30:00Z", winner="HOME_TEAM")
+    assert LAFC.parse_football_data_results(data, date(2024, 5, 4)) == "Win"
+    assert LAFC.parse_football_data_results(data, date(2024, 5, 5)) == "The game has not finished yet!"
+
+
+# stand-in payloads for an evening match today, which records the hosts that were asked
+class RecordingFixtures(benchmark_fixtures.Fixtures):
+    def __init__(self, outage=()):
+        evening = LAFC.pacific_tz.localize(datetime.combine(datetime.now(LAFC.pacific_tz).date(), time(21)))
+        super().__init__(now=evening)
+        self.routes = [route for route in self.routes if route[0] not in outage]
+        self.requested = []
+
+    def lookup(self, host, path, query):
+        self.requested.append(host)
+        return super().lookup(host, path, query)
+
+
+def test_match_results_from_football_data(stand_in, monkeypatch):
+    monkeypatch.setenv("FOOTBALL_DATA_TOKEN", "test")
+    served = RecordingFixtures()
+    assert stand_in(LAFC.get_match_results, served) == "Draw"
+    assert served.requested == ["api.football-data.org"]
+
+
+def test_match_results_fall_back_to_espn(stand_in, monkeypatch):
+    monkeypatch.setenv("FOOTBALL_DATA_TOKEN", "test")
+    served = RecordingFixtures(outage={"api.football-data.org"})
+    assert stand_in(LAFC.get_match_results, served) == "Draw"
+    assert served.requested == ["api.football-data.org", "www.espn.com"]
@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+import Anaheim_Ducks
+import LAFC
+import LA_Angels
+import LA_Clippers
+import benchmark_fixtures
+import loop_monitor
+
+# Every fetch has to leave the event loop free for the Discord gateway and the other pollers. Each fetcher
+# runs cold (empty caches, full download and parse) against the stand-in server while the loop_monitor
+# heartbeat measures how late the loop wakes up, and the test fails if it was ever stuck for longer than
+# the threshold at which loop_monitor reports a blocking call.
+
+FETCHERS = {
+    "LAFC season schedule": LAFC.load_season_schedule,
+    "LAFC match results": LAFC.get_match_results,
+    "LAFC ESPN results": LAFC.get_espn_match_results,
+    "Ducks scoreboard": Anaheim_Ducks.get_scoreboard,
+    "Ducks season schedule": Anaheim_Ducks.load_season_schedule,
+    "Ducks score": lambda: Anaheim_Ducks.check_ducks_score(benchmark_fixtures.DUCKS_GAME_ID),
+    "Angels season schedule": LA_Angels.load_season_schedule,
+    "Angels today schedule": LA_Angels.get_today_schedule,
+    "Angels live feed": lambda: LA_Angels.poll_live_game(benchmark_fixtures.ANGELS_GAME_PK),
+    "Clippers season schedule": LA_Clippers.load_season_schedule,
+    "Clippers game id": LA_Clippers.get_game_id_today,
+    "Clippers play-by-play": lambda: LA_Clippers.get_pbp_tracker(benchmark_fixtures.CLIPPERS_GAME_ID).poll(),
+}
+
+
+async def max_lag_during(fetch):
+    loop_monitor.stats["max_lag"] = 0.0
+    loop_monitor.start()
+    try:
+        await asyncio.sleep(loop_monitor.HEARTBEAT_INTERVAL)  # let the heartbeat take its first beat
+        await fetch()
+        # a blocked loop is only noticed when the heartbeat wakes up after it
+        await asyncio.sleep(2 * loop_monitor.HEARTBEAT_INTERVAL)
+    finally:
+        loop_monitor.stop()
+    return loop_monitor.stats["max_lag"]
+
+
+@pytest.mark.parametrize("fetch", FETCHERS.values(), ids=FETCHERS.keys())
+def test_fetch_does_not_block_the_loop(stand_in, fetch):
+    max_lag = stand_in(lambda: max_lag_during(fetch))
+    assert max_lag < loop_monitor.BLOCK_THRESHOLD
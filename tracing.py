@@ -0,0 +1,180 @@
+import argparse
+import contextlib
+import contextvars
+import functools
+import glob
+import inspect
+import itertools
+import json
+import logging
+import logging.handlers
+import math
+import os
+import queue
+import statistics
+import time
+
+# Lightweight spans around each stage of a poll (discovery, fetch, parse, check, send) and each chat
+# command, written one JSON object per line to a rotating local trace file. Spans nest through a context
+# variable, so a fetch inside a team's poll records the poll as its parent. The file is written by a
+# background thread, the event loop only formats the line.
+#
+#   python tracing.py                     # slowest stages over the last hour
+#   python tracing.py --since 24h --top 20
+
+logger = logging.getLogger(__name__)
+
+TRACE_PATH = os.getenv("TRACE_PATH", "trace.jsonl")
+TRACE_MAX_BYTES = 5 * 1024 * 1024  # size at which the trace file is rotated
+TRACE_BACKUPS = 3  # rotated files kept next to the current one
+ENABLED = os.getenv("TRACING", "1") != "0"
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_span_ids = itertools.count(1)
+_trace_logger = None
+_listener = None
+
+
+# sends span lines to the trace file through a queue, so the rotating file handler runs on its own thread
+def _writer():
+    global _trace_logger, _listener
+    if _trace_logger is None:
+        handler = logging.handlers.RotatingFileHandler(TRACE_PATH, maxBytes=TRACE_MAX_BYTES,
+                                                       backupCount=TRACE_BACKUPS)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        span_queue = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(span_queue, handler)
+        _listener.start()
+
+        _trace_logger = logging.getLogger("chickbot.trace")
+        _trace_logger.propagate = False
+        _trace_logger.setLevel(logging.INFO)
+        _trace_logger.addHandler(logging.handlers.QueueHandler(span_queue))
+    return _trace_logger
+
+
+# records how long the block takes as a span, e.g. "with tracing.span('fetch', host=host) as attributes:",
+# attributes added to the yielded dict inside the block are recorded too
+@contextlib.contextmanager
+def span(name, **attributes):
+    if not ENABLED:
+        yield attributes
+        return
+
+    parent = _current_span.get()
+    span_id = next(_span_ids)
+    token = _current_span.set((parent[0] if parent else span_id, span_id))
+    started_at = time.time()
+    started = time.perf_counter()
+    error = None
+    try:
+        yield attributes
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        record = {
+            "name": name,
+            "start": round(started_at, 3),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+            "trace": parent[0] if parent else span_id,
+            "span": span_id,
+            "parent": parent[1] if parent else None,
+        }
+        if attributes:
+            record["attributes"] = attributes
+        if error:
+            record["error"] = error
+        _writer().info(json.dumps(record, default=str))
+
+
+# decorator that wraps every call of a function (sync or async) in a span
+def traced(name, **attributes):
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name, **attributes):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, **attributes):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# flushes the queued spans to the file
+def stop():
+    global _listener, _trace_logger
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+        _trace_logger = None
+
+
+# returns every span recorded at or after "since" (unix time), oldest files first
+def read_spans(path=TRACE_PATH, since=0.0):
+    files = sorted(glob.glob(f"{glob.escape(path)}.*"), key=lambda name: -int(name.rsplit(".", 1)[1])
+                   if name.rsplit(".", 1)[1].isdigit() else 0)
+    for file_name in files + [path]:
+        if not os.path.exists(file_name):
+            continue
+        with open(file_name) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("start", 0) >= since:
+                    yield record
+
+
+# groups the spans by stage (name plus team or command) and returns rows sorted by their p95 duration
+def summarize(spans):
+    durations = {}
+    for record in spans:
+        attributes = record.get("attributes", {})
+        stage = record["name"]
+        label = attributes.get("team") or attributes.get("command") or attributes.get("host")
+        if label:
+            stage = f"{stage} [{label}]"
+        durations.setdefault(stage, []).append(record["duration_ms"])
+
+    rows = []
+    for stage, values in durations.items():
+        values.sort()
+        rows.append({
+            "stage": stage,
+            "count": len(values),
+            "p50_ms": statistics.median(values),
+            "p95_ms": values[math.ceil(0.95 * len(values)) - 1],
+            "max_ms": values[-1],
+            "total_ms": sum(values),
+        })
+    return sorted(rows, key=lambda row: row["p95_ms"], reverse=True)
+
+
+# parses a window such as "90s", "15m", "1h" or "2d" into seconds
+def parse_window(text):
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    if text[-1] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Summarize the slowest stages in the trace log")
+    parser.add_argument("--path", default=TRACE_PATH)
+    parser.add_argument("--since", default="1h", help="time window, e.g. 30m, 6h, 2d (default 1h)")
+    parser.add_argument("--top", type=int, default=15, help="number of stages to show")
+    args = parser.parse_args()
+
+    summary = summarize(read_spans(args.path, time.time() - parse_window(args.since)))
+    print(f"{'stage':<40} {'count':>7} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10} {'total ms':>12}")
+    for row in summary[:args.top]:
+        print(f"{row['stage']:<40} {row['count']:>7} {row['p50_ms']:>10.1f} {row['p95_ms']:>10.1f} "
+              f"{row['max_ms']:>10.1f} {row['total_ms']:>12.1f}")
@@ -1,18 +1,47 @@
-from flask import Flask
-from threading import Thread
+import logging
+import os
 
-app = Flask('')
+from aiohttp import web
 
+import metrics
 
-@app.route('/')
-def home():
-    return "Discord bot ok"
+# Small HTTP server running inside the bot's event loop: "/" answers the hosting platform's keep-alive
+# checks and "/metrics" exposes the bot's metrics in the Prometheus text format.
 
+logger = logging.getLogger(__name__)
 
-def run():
-    app.run(host="0.0.0.0", port=8080)
+WEB_HOST = "0.0.0.0"
+WEB_PORT = int(os.getenv("PORT", "8080"))
 
+_runner = None
 
-def keep_alive():
-    t = Thread(target=run)
-    t.start()
+
+async def home(request):
+    return web.Response(text="Discord bot ok")
+
+
+async def metrics_page(request):
+    return web.Response(body=metrics.render().encode(),
+                        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+
+# starts serving on the event loop, safe to call more than once
+async def start(host=WEB_HOST, port=WEB_PORT):
+    global _runner
+    if _runner is not None:
+        return
+
+    app = web.Application()
+    app.router.add_get("/", home)
+    app.router.add_get("/metrics", metrics_page)
+    _runner = web.AppRunner(app, access_log=None)
+    await _runner.setup()
+    await web.TCPSite(_runner, host, port).start()
+    logger.info(f"Web server listening on {host}:{port}")
+
+
+async def stop():
+    global _runner
+    if _runner is not None:
+        await _runner.cleanup()
+        _runner = None